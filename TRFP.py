@@ -1,21 +1,35 @@
 import os
+import io
 import plexapi.server
 from plexapi.server import PlexServer
 from plexapi.myplex import MyPlexAccount
 import yaml
 import sys
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Set, Optional, Tuple
-from collections import Counter, defaultdict
+from collections import Counter, OrderedDict, defaultdict
 import time
 import webbrowser
 import random
 import json
+import sqlite3
+import shutil
 from urllib.parse import quote
 import re
+import unicodedata
 from datetime import datetime, timedelta
 import math
-import copy
+import threading
+import heapq
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 __version__ = "2.2"
 REPO_URL = "https://github.com/netplexflix/TV-Show-Recommendations-for-Plex"
@@ -78,6 +92,55 @@ RATING_MULTIPLIERS = {
     9: 1.8,   # Excellent
     10: 2.0   # Outstanding
     }
+
+# Watch profile counters built from watched shows
+PROFILE_COUNTERS = ('genres', 'studio', 'actors', 'languages', 'tmdb_keywords')
+
+# New TMDB IDs/keywords are written to the watched cache in batches, at most this many or this old
+WATCHED_CACHE_FLUSH_COUNT = 50
+WATCHED_CACHE_FLUSH_SECONDS = 30
+
+# Below this many candidates, process start-up costs more than scoring in one process
+SCORING_PROCESS_MIN_SHOWS = 2000
+
+def atomic_write_text(path: str, text: str, keep_backup: bool = True):
+    """Crash-safe write: fsync a temp file, keep the current file as ``.bak``, then rename into place.
+    Files holding secrets pass ``keep_backup=False`` so no old copy is left behind."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        if os.path.exists(path):
+            # Keep the original permissions, set before anything is written
+            shutil.copymode(path, temp_path)
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    if keep_backup and os.path.exists(path):
+        os.replace(path, f"{path}.bak")
+    elif not keep_backup and os.path.exists(f"{path}.bak"):
+        os.remove(f"{path}.bak")
+    os.replace(temp_path, path)
+
+def atomic_write_json(path: str, data, **dump_kwargs):
+    atomic_write_text(path, json.dumps(data, **dump_kwargs))
+
+def load_json_with_backup(path: str, what: str):
+    """Load a JSON file, falling back to its ``.bak`` generation if it is missing or corrupt.
+    Returns None when neither can be read."""
+    for candidate in (path, f"{path}.bak"):
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if candidate != path:
+                print(f"{YELLOW}Recovered {what} from {os.path.basename(candidate)}{RESET}")
+            return data
+        except Exception as e:
+            print(f"{YELLOW}Error loading {what} from {os.path.basename(candidate)}: {e}{RESET}")
+    return None
+
+def backup_exists(path: str) -> bool:
+    return os.path.exists(path) or os.path.exists(f"{path}.bak")
 	
 def check_version():
     try:
@@ -96,178 +159,1237 @@ def check_version():
     except Exception as e:
         print(f"{YELLOW}Unable to check for updates: {str(e)}{RESET}")
 
+class RateLimiter:
+    """Thread-safe token bucket shared by every worker talking to one API.
+
+    A 429 pauses the whole bucket (honouring Retry-After) instead of
+    sleeping in the thread that happened to hit it.
+    """
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = max(float(rate), 0.01)
+        self.capacity = float(burst if burst is not None else max(1, int(self.rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    @staticmethod
+    def parse_retry_after(retry_after: Optional[str], attempt: int = 0) -> float:
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            return 2.0 * (attempt + 1)
+
+    def backoff(self, retry_after: Optional[str], attempt: int = 0) -> float:
+        """Pause all callers for Retry-After seconds (or an exponential fallback)"""
+        delay = self.parse_retry_after(retry_after, attempt)
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.tokens = 0
+        return delay
+
+class APIClient:
+    """Pooled HTTP client for one service.
+
+    Wraps a ``requests.Session`` with a urllib3 ``Retry`` adapter for
+    connection errors and 5xx responses. 429s are handled here through the
+    service's RateLimiter so a Retry-After pauses every thread using it.
+    """
+    def __init__(self, base_url: str = '', headers: Optional[Dict] = None, params: Optional[Dict] = None,
+                 timeout: float = 30, rate_limiter: Optional[RateLimiter] = None,
+                 retries: int = 3, pool_size: int = 10):
+        self.base_url = base_url.rstrip('/')
+        self.params = params or {}
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.retries = retries
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        retry = Retry(
+            total=retries,
+            backoff_factor=1,
+            status_forcelist=(500, 502, 503, 504),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        url = path if path.startswith('http') else f"{self.base_url}{path}"
+        if self.params:
+            kwargs['params'] = {**self.params, **(kwargs.get('params') or {})}
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429 or attempt == self.retries:
+                return response
+            retry_after = response.headers.get('Retry-After')
+            if self.rate_limiter:
+                delay = self.rate_limiter.backoff(retry_after, attempt)
+            else:
+                delay = RateLimiter.parse_retry_after(retry_after, attempt)
+                time.sleep(delay)
+            print(f"{YELLOW}Rate limit hit on {self.base_url or url}, waiting {delay:.0f}s...{RESET}")
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> requests.Response:
+        return self.request('PUT', path, **kwargs)
+
+class ResponseCache:
+    """Size-bounded LRU cache of JSON API responses, persisted to disk.
+
+    Entries expire after a TTL chosen by the first pattern in ``ttls`` that
+    matches the request path. Keys combine the path with the sorted query
+    parameters, leaving out credentials.
+    """
+    def __init__(self, path: str, ttls: List[Tuple[str, int]], max_entries: int = 20000,
+                 ignored_params: Tuple[str, ...] = ('api_key',)):
+        self.path = path
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.max_entries = max_entries
+        self.ignored_params = ignored_params
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        data = load_json_with_backup(path, "response cache")
+        if data:
+            self.entries = OrderedDict(data.get('entries', []))
+
+    def _ttl(self, path: str) -> int:
+        for pattern, ttl in self.ttls:
+            if pattern.search(path):
+                return ttl
+        return 0
+
+    def key(self, path: str, params: Optional[Dict]) -> str:
+        query = sorted((k, str(v)) for k, v in (params or {}).items()
+                       if k not in self.ignored_params and v is not None)
+        return f"{path}?{json.dumps(query, ensure_ascii=False)}"
+
+    def get(self, path: str, params: Optional[Dict]):
+        key = self.key(path, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and time.time() - entry['stored'] < self._ttl(path):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry['data']
+            self.misses += 1
+            return None
+
+    def put(self, path: str, params: Optional[Dict], data):
+        if not self._ttl(path):
+            return
+        with self.lock:
+            key = self.key(path, params)
+            self.entries[key] = {'stored': time.time(), 'data': data}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            with self.lock:
+                now = time.time()
+                entries = [(k, v) for k, v in self.entries.items() if now - v['stored'] < self._ttl(k.split('?', 1)[0])]
+                atomic_write_json(self.path, {'entries': entries}, ensure_ascii=False)
+                self.dirty = False
+        except Exception as e:
+            print(f"{YELLOW}Error saving response cache: {e}{RESET}")
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {len(self.entries)} entries"
+
+# How long (seconds) each TMDB endpoint stays cached, first match wins
+TMDB_CACHE_TTLS = [
+    (r'^/tv/\d+/keywords$', 30 * 86400),
+    (r'^/tv/\d+/external_ids$', 30 * 86400),
+    (r'^/find/', 30 * 86400),
+    (r'^/tv/\d+/credits$', 7 * 86400),
+    (r'^/search/tv$', 7 * 86400),
+    (r'^/tv/\d+$', 3 * 86400),
+]
+
+class TMDBClient(APIClient):
+    def __init__(self, api_key: Optional[str], requests_per_second: float = 10,
+                 response_cache: Optional[ResponseCache] = None):
+        super().__init__(
+            "https://api.themoviedb.org/3",
+            params={'api_key': api_key},
+            timeout=15,
+            rate_limiter=RateLimiter(requests_per_second)
+        )
+        self.response_cache = response_cache
+
+    def get_json(self, path: str, params: Optional[Dict] = None, **kwargs):
+        """GET a TMDB endpoint, serving it from the response cache when possible.
+        Raises requests.HTTPError for unsuccessful responses."""
+        if self.response_cache:
+            data = self.response_cache.get(path, params)
+            if data is not None:
+                return data
+        resp = self.get(path, params=params, **kwargs)
+        resp.raise_for_status()
+        data = resp.json()
+        if self.response_cache:
+            self.response_cache.put(path, params, data)
+        return data
+
+class TraktClient(APIClient):
+    def __init__(self, requests_per_second: float = 3):
+        super().__init__(
+            "https://api.trakt.tv",
+            timeout=30,
+            rate_limiter=RateLimiter(requests_per_second)
+        )
+
+class TautulliClient(APIClient):
+    def __init__(self, url: str, api_key: str):
+        super().__init__(f"{url.rstrip('/')}/api/v2", params={'apikey': api_key}, timeout=60)
+
+    def call(self, cmd: str, **params) -> requests.Response:
+        return self.get('', params={'cmd': cmd, **params})
+
+class SonarrClient(APIClient):
+    def __init__(self, url: str, api_key: str):
+        sonarr_url = url.rstrip('/')
+        if '/api/' not in sonarr_url:
+            sonarr_url += '/api/v3'
+        super().__init__(
+            sonarr_url,
+            headers={'X-Api-Key': api_key, 'Content-Type': 'application/json'},
+            timeout=30
+        )
+
+class TautulliHistoryLoader:
+    """Fetches each Tautulli user's episode history once per run and memoizes it.
+
+    History is kept incrementally: ``export_state`` returns the rows seen so
+    far plus a per-user cursor (newest row id and date) to persist in the
+    watched cache, and after ``load_state`` only rows newer than the cursor
+    are requested from Tautulli and merged in.
+
+    With ``grouping`` on, Tautulli's grouped history is requested instead
+    (resumed sessions of an episode collapse into one row, keyed by
+    ``reference_id``). ``verify`` also fetches the raw history once per
+    user and falls back to it unless both yield the same shows, episodes
+    and Trakt sync entries (watch date, season and episode). A user whose
+    check failed stays on raw history, synced incrementally.
+    """
+    # Columns kept from each history row; everything else is dropped before persisting
+    HISTORY_COLUMNS = (
+        'id', 'reference_id', 'date', 'rating_key', 'grandparent_rating_key', 'grandparent_title',
+        'parent_media_index', 'media_index', 'watched_status'
+    )
+
+    def __init__(self, client: TautulliClient, page_size: int = 1000,
+                 grouping: bool = False, verify: bool = False):
+        self.client = client
+        self.page_size = page_size
+        self.grouping = grouping
+        self.verify = verify
+        self._users = None
+        self._history = {}
+        self._state = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load_state(self, state: Dict):
+        # Rows stored in the other history mode are refetched from scratch
+        self._state = {str(user_id): user_state for user_id, user_state in (state or {}).items()
+                       if isinstance(user_state, dict) and 'rows' in user_state
+                       and (user_state.get('grouped', False) == self.grouping
+                            or (self.grouping and user_state.get('grouping_failed')))}
+
+    def export_state(self) -> Dict:
+        return self._state
+
+    def users(self) -> List[Dict]:
+        with self.lock:
+            if self._users is None:
+                users_response = self.client.call('get_users')
+                users_response.raise_for_status()
+                self._users = users_response.json()['response']['data']
+            return self._users
+
+    def history(self, user_id: str) -> List[Dict]:
+        """All history rows for a user, newest first"""
+        with self.lock:
+            if user_id not in self._history:
+                self._history[user_id] = self._sync_history(str(user_id))
+            return self._history[user_id]
+
+    @staticmethod
+    def _row_key(row: Dict, grouped: bool):
+        # A grouped row keeps its reference_id as sessions are added to it, but its id can change
+        if grouped and row.get('reference_id'):
+            return ('ref', row['reference_id'])
+        return row.get('id') or (row.get('date'), row.get('rating_key'))
+
+    def _sync_history(self, user_id: str) -> List[Dict]:
+        cached = self._state.get(user_id)
+        cursor = (cached or {}).get('cursor') or {}
+        # Users whose grouped history failed verification keep using raw history
+        grouping_failed = self.grouping and bool((cached or {}).get('grouping_failed'))
+        grouped = self.grouping and not grouping_failed
+        
+        if cached and cursor.get('date'):
+            # Tautulli's 'after' filter is per day and inclusive, so step back a day and de-duplicate
+            after = (datetime.fromtimestamp(int(cursor['date'])) - timedelta(days=1)).strftime('%Y-%m-%d')
+            print(f"\n{GREEN}Fetching new history for user ID: {user_id} (since {after}){RESET}")
+            fetched_rows = self._fetch_history(user_id, after=after, grouping=grouped)
+            if fetched_rows is None:
+                return self._keep_cached_history(user_id)
+            known = {self._row_key(row, grouped): row for row in cached['rows']}
+            fetched = {self._row_key(row, grouped): row for row in fetched_rows}
+            # Fetched rows replace their cached copies, so a grouped row that grew picks up its new status
+            new_rows = [row for key, row in fetched.items() if known.get(key) != row]
+            rows = list(fetched.values()) + [row for key, row in known.items() if key not in fetched]
+        else:
+            print(f"\n{GREEN}Fetching history for user ID: {user_id}{RESET}")
+            new_rows = self._fetch_history(user_id, grouping=grouped)
+            if new_rows is None:
+                return self._keep_cached_history(user_id)
+            if grouped and self.verify:
+                new_rows, grouped = self._verify_grouped_history(user_id, new_rows)
+                grouping_failed = not grouped
+            rows = new_rows
+        
+        if new_rows or not cached:
+            rows.sort(key=lambda row: int(row.get('date') or 0), reverse=True)
+            newest = rows[0] if rows else {}
+            self._state[user_id] = {
+                'rows': rows,
+                'grouped': grouped,
+                'cursor': {
+                    'id': max((int(row['id']) for row in rows if str(row.get('id', '')).isdigit()), default=None),
+                    'date': newest.get('date')
+                }
+            }
+            if grouping_failed:
+                self._state[user_id]['grouping_failed'] = True
+            self.dirty = True
+        print(f"{len(new_rows)} new history rows (Total: {len(rows)})")
+        return rows
+
+    def _keep_cached_history(self, user_id: str) -> List[Dict]:
+        """After a failed fetch: use the stored rows and leave the state and cursor untouched,
+        so the rows that weren't fetched are requested again next run"""
+        cached = self._state.get(user_id)
+        print(f"{YELLOW}History fetch for user ID {user_id} failed; "
+              f"using {len(cached['rows']) if cached else 0} stored rows{RESET}")
+        return list(cached['rows']) if cached else []
+
+    @staticmethod
+    def _history_signature(rows: List[Dict]) -> Tuple[Set[str], Set[str], Dict[str, tuple]]:
+        """What the rest of the app reads from history: watched shows, episodes, and for each
+        fully watched episode the date, season and episode of its newest watched row (the Trakt sync entry)"""
+        watched = {}
+        for row in sorted(rows, key=lambda row: int(row.get('date') or 0), reverse=True):
+            if row.get('rating_key') and row.get('watched_status') == 1:
+                watched.setdefault(str(row['rating_key']),
+                                   (row.get('date'), row.get('parent_media_index'), row.get('media_index')))
+        return (
+            {str(row['grandparent_rating_key']) for row in rows if row.get('grandparent_rating_key')},
+            {str(row['rating_key']) for row in rows if row.get('rating_key')},
+            watched
+        )
+
+    def _verify_grouped_history(self, user_id: str, grouped_rows: List[Dict]) -> Tuple[List[Dict], bool]:
+        """Compare grouped history with the raw rows.
+        Returns the rows to use and whether they are the grouped ones."""
+        print(f"Verifying grouped history against raw history for user ID: {user_id}")
+        raw_rows = self._fetch_history(user_id, grouping=False)
+        if raw_rows is None:
+            print(f"{YELLOW}Could not fetch raw history; using grouped history unverified{RESET}")
+            return grouped_rows, True
+        grouped = self._history_signature(grouped_rows)
+        raw = self._history_signature(raw_rows)
+        if grouped == raw:
+            print(f"{GREEN}Grouped history matches raw history ({len(grouped_rows)} vs {len(raw_rows)} rows){RESET}")
+            return grouped_rows, True
+        
+        for label, grouped_part, raw_part in zip(('shows', 'episodes', 'watched episodes'), grouped, raw):
+            if grouped_part != raw_part:
+                extra = set(grouped_part) - set(raw_part)
+                missing = set(raw_part) - set(grouped_part)
+                message = f"{len(extra)} extra, {len(missing)} missing"
+                if isinstance(raw_part, dict):
+                    changed = sum(1 for key in set(grouped_part) & set(raw_part) if grouped_part[key] != raw_part[key])
+                    message += f", {changed} with a different date, season or episode"
+                print(f"{RED}Grouped history differs in {label}: {message}{RESET}")
+        print(f"{YELLOW}Using raw history for user ID: {user_id} from now on{RESET}")
+        return raw_rows, False
+
+    def _fetch_history(self, user_id: str, after: Optional[str] = None,
+                       grouping: Optional[bool] = None) -> Optional[List[Dict]]:
+        """All history pages for a user, or None if any page fails"""
+        history_items = []
+        start = 0
+        grouping = self.grouping if grouping is None else grouping
+        while True:
+            params = {
+                'media_type': 'episode',
+                'user_id': user_id,
+                'grouping': int(grouping),  # Explicit, so Tautulli's own group setting doesn't apply
+                'length': self.page_size,  # Max per Tautulli API
+                'start': start,
+                'order_column': 'date',
+                'order_dir': 'desc'
+            }
+            if after:
+                params['after'] = after
+            try:
+                response = self.client.call('get_history', **params)
+                response.raise_for_status()
+                history_data = response.json()['response'].get('data', {})
+                
+                # Handle different response formats
+                if isinstance(history_data, dict):
+                    page_items = history_data.get('data', [])
+                    total_records = history_data.get('recordsFiltered', 0)
+                else:  # Legacy format
+                    page_items = history_data
+                    total_records = len(page_items)
+                
+                history_items.extend(
+                    {column: item.get(column) for column in self.HISTORY_COLUMNS}
+                    for item in page_items if isinstance(item, dict)
+                )
+                print(f"Fetched {len(page_items)} episodes (Total: {len(history_items)})")
+                
+                if not page_items or start + len(page_items) >= total_records:
+                    break
+                start += len(page_items)
+                
+            except Exception as e:
+                print(f"{RED}Error fetching history page: {e}{RESET}")
+                return None
+        return history_items
+
+TITLE_YEAR_SUFFIX = re.compile(r'\s*\((\d{4})\)$')
+TITLE_LEADING_ARTICLE = re.compile(r'^(the|a|an)\s+')
+TITLE_PUNCTUATION = re.compile(r'[^\w\s]')
+
+def normalize_title(title: str) -> Tuple[str, Optional[int]]:
+    """Normalize a show title for library matching.
+
+    Returns the normalized title and the year embedded as a ``(YYYY)`` suffix, if any.
+    Case, accents, punctuation, ``&``/``and`` and a leading article are ignored.
+    """
+    title = title.strip().lower()
+    embedded_year = None
+    year_match = TITLE_YEAR_SUFFIX.search(title)
+    if year_match:
+        embedded_year = int(year_match.group(1))
+        title = title[:year_match.start()]
+    title = unicodedata.normalize('NFKD', title)
+    title = ''.join(c for c in title if not unicodedata.combining(c))
+    title = TITLE_PUNCTUATION.sub(' ', title.replace('&', ' and '))
+    title = ' '.join(title.split())
+    return TITLE_LEADING_ARTICLE.sub('', title), embedded_year
+
+class LibrarySnapshot:
+    """Single listing of the Plex TV library, loaded once per run.
+
+    The show cache, the title index and the external ID sets are all
+    derived from this one ``section.all()`` call.
+    """
+    EXTERNAL_ID_SOURCES = ('imdb', 'tmdb', 'tvdb')
+
+    def __init__(self, plex, library_title: str):
+        self.section = plex.library.section(library_title)
+        self.shows = self.section.all(includeGuids=True)
+        self.rating_keys = {int(show.ratingKey) for show in self.shows}
+        self._title_index = None
+        self._external_ids = None
+
+    @property
+    def title_index(self) -> Dict[str, Set[Optional[int]]]:
+        """Normalized title -> years of the library shows carrying that title"""
+        if self._title_index is None:
+            index = defaultdict(set)
+            for show in self.shows:
+                title, embedded_year = normalize_title(show.title)
+                index[title].add(show.year)
+                if embedded_year:
+                    index[title].add(embedded_year)
+            self._title_index = dict(index)
+        return self._title_index
+
+    @property
+    def external_ids(self) -> Dict[str, Set[str]]:
+        """IMDb/TMDB/TVDB IDs of the library shows, keyed by source"""
+        if self._external_ids is None:
+            external_ids = {source: set() for source in self.EXTERNAL_ID_SOURCES}
+            for show in self.shows:
+                for guid in getattr(show, 'guids', None) or []:
+                    source, _, value = guid.id.partition('://')
+                    if source in external_ids and value:
+                        external_ids[source].add(value.split('?')[0])
+            self._external_ids = external_ids
+        return self._external_ids
+
+    @property
+    def imdb_ids(self) -> Set[str]:
+        return self.external_ids['imdb']
+
+def tvdb_id_from_guids(item) -> Optional[int]:
+    """Extract the TVDB ID from a Plex item's GUIDs"""
+    for guid in getattr(item, 'guids', None) or []:
+        if 'tvdb://' in guid.id:
+            try:
+                return int(guid.id.split('tvdb://')[1].split('?')[0])
+            except (ValueError, IndexError):
+                continue
+    return None
+
+class EpisodeIndex:
+    """Persistent index of episode ratingKey -> [tvdb_id, season, episode, show ratingKey].
+
+    Filled lazily: a whole show is indexed with one ``allLeaves`` listing
+    (including GUIDs) and re-indexed when the show's updatedAt changes, while
+    stray episodes are fetched in batches with a single
+    ``/library/metadata/<key1,key2,...>`` request each. Only episodes with a
+    TVDB ID are kept from those batches; missing ones are asked for again
+    next time, as they may still get a GUID. Entries from a show listing are
+    kept as-is and refreshed with the show.
+    Shared between per-user recommenders, so all mutations take ``lock``.
+    """
+    def __init__(self, cache_dir: str, plex, batch_size: int = 100):
+        self.path = os.path.join(cache_dir, "episode_index.json")
+        self.plex = plex
+        self.batch_size = batch_size
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.episodes = {}
+        self.shows = {}
+        data = load_json_with_backup(self.path, "episode index")
+        if data:
+            self.shows = data.get('shows', {})
+            # Drop negative entries from older versions that no show listing would ever refresh
+            self.episodes = {key: entry for key, entry in data.get('episodes', {}).items()
+                             if entry[0] or entry[3] in self.shows}
+        # Show ratingKey -> its episode keys, so re-indexing a show doesn't scan every episode
+        self.show_episodes = defaultdict(set)
+        for key, entry in self.episodes.items():
+            if entry[3]:
+                self.show_episodes[entry[3]].add(key)
+
+    def _store(self, key: str, entry: list):
+        old = self.episodes.get(key)
+        if old and old[3]:
+            self.show_episodes[old[3]].discard(key)
+        self.episodes[key] = entry
+        if entry[3]:
+            self.show_episodes[entry[3]].add(key)
+
+    @staticmethod
+    def _entry(episode) -> list:
+        show_key = getattr(episode, 'grandparentRatingKey', None)
+        return [tvdb_id_from_guids(episode), getattr(episode, 'parentIndex', None),
+                getattr(episode, 'index', None), str(show_key) if show_key else None]
+
+    def ensure_show(self, show):
+        """Index all episodes of a show unless it is unchanged since it was last indexed"""
+        show_key = str(show.ratingKey)
+        updated_at = ShowCache._plex_timestamp(show)
+        with self.lock:
+            if show_key in self.shows and self.shows[show_key] == updated_at:
+                return
+        try:
+            items = self.plex.fetchItems(f"/library/metadata/{show_key}/allLeaves", params={'includeGuids': 1})
+        except Exception as e:
+            print(f"{YELLOW}Error indexing episodes for {show.title}: {e}{RESET}")
+            return
+        with self.lock:
+            for key in self.show_episodes.pop(show_key, ()):
+                self.episodes.pop(key, None)
+            for item in items:
+                self._store(str(item.ratingKey), self._entry(item))
+            self.shows[show_key] = updated_at
+            self.dirty = True
+
+    def resolve(self, rating_keys) -> Dict[str, Optional[int]]:
+        """TVDB IDs for the given episode ratingKeys, fetching unknown ones in bulk"""
+        keys = {str(key) for key in rating_keys}
+        with self.lock:
+            missing = sorted(key for key in keys if key not in self.episodes and key.isdigit())
+        if len(missing) > self.batch_size:
+            print(f"Resolving TVDB IDs for {len(missing)} episodes ({len(keys) - len(missing)} cached)...")
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            try:
+                items = self.plex.fetchItems([int(key) for key in batch], params={'includeGuids': 1})
+            except Exception as e:
+                print(f"{YELLOW}Error fetching episode batch: {e}{RESET}")
+                continue
+            found = {str(item.ratingKey): self._entry(item) for item in items}
+            with self.lock:
+                for key, entry in found.items():
+                    if entry[0]:
+                        self._store(key, entry)
+                        self.dirty = True
+            if len(missing) > self.batch_size:
+                done = min(start + self.batch_size, len(missing))
+                sys.stdout.write(f"\rResolving episodes: {done}/{len(missing)} ({int(done / len(missing) * 100)}%)")
+                sys.stdout.flush()
+        if len(missing) > self.batch_size:
+            print("")
+        with self.lock:
+            return {key: self.episodes[key][0] if key in self.episodes else None for key in keys}
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                atomic_write_json(self.path, {'shows': self.shows, 'episodes': self.episodes}, separators=(',', ':'))
+                self.dirty = False
+            except Exception as e:
+                print(f"{YELLOW}Error saving episode index: {e}{RESET}")
+
+# Shared SQLite database for the show cache, watched caches and Trakt sync state
+CACHE_DB_NAME = "trfp_cache.db"
+
+def connect_cache_db(path: str) -> sqlite3.Connection:
+    """Open the cache database in WAL mode so several runs can read it while one writes"""
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class JSONShowStore:
+    """Show cache kept as one JSON document (the original all_shows_cache.json format)"""
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[Dict]:
+        return load_json_with_backup(self.path, "all shows cache")
+
+    def save(self, cache: Dict, changed: Optional[Set[str]] = None, removed: Optional[Set[str]] = None):
+        atomic_write_json(self.path, cache, indent=4, ensure_ascii=False)
+
+class SQLiteShowStore:
+    """Show cache in SQLite: one row per show, with genres, actors, keywords,
+    studios and languages interned in a vocab table and list fields stored as
+    comma-separated vocab ids.
+
+    Only shows that changed since the last save are written. An existing
+    all_shows_cache.json is imported once when the database is empty.
+    """
+    # Show fields in the order ShowCache builds them; the bitmask records which ones an entry has
+    FIELDS = ('title', 'year', 'genres', 'studio', 'cast', 'summary', 'language',
+              'tmdb_keywords', 'tmdb_id', 'imdb_id', 'updated_at')
+    LIST_FIELDS = {'genres': 'genre', 'cast': 'actor', 'tmdb_keywords': 'keyword'}
+    INTERNED_FIELDS = {'studio': 'studio', 'language': 'language'}
+    COLUMNS = ", ".join(f'"{field}"' for field in FIELDS)
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS vocab (
+            id INTEGER PRIMARY KEY, kind TEXT NOT NULL, name TEXT NOT NULL, UNIQUE (kind, name));
+        CREATE TABLE IF NOT EXISTS shows (
+            rating_key TEXT PRIMARY KEY, position INTEGER NOT NULL, fields INTEGER NOT NULL,
+            title TEXT, year INTEGER, genres TEXT, studio INTEGER, "cast" TEXT, summary TEXT,
+            language INTEGER, tmdb_keywords TEXT, tmdb_id INTEGER, imdb_id TEXT, updated_at INTEGER,
+            extra TEXT);
+    """
+
+    def __init__(self, path: str, json_path: Optional[str] = None):
+        self.path = path
+        self.json_path = json_path
+        self.lock = threading.Lock()
+        self.conn = connect_cache_db(path)
+        self.conn.executescript(self.SCHEMA)
+        self.vocab = {}
+        self.vocab_ids = {}
+        self.next_position = 0
+        self.needs_full_save = False
+
+    def _intern(self, kind: str, name: str) -> int:
+        vocab_id = self.vocab_ids.get((kind, name))
+        if vocab_id is None:
+            cursor = self.conn.execute("INSERT INTO vocab (kind, name) VALUES (?, ?)", (kind, name))
+            vocab_id = cursor.lastrowid
+            self.vocab_ids[(kind, name)] = vocab_id
+            self.vocab[vocab_id] = name
+        return vocab_id
+
+    def load(self) -> Optional[Dict]:
+        with self.lock:
+            for vocab_id, kind, name in self.conn.execute("SELECT id, kind, name FROM vocab"):
+                self.vocab[vocab_id] = name
+                self.vocab_ids[(kind, name)] = vocab_id
+            vocab = self.vocab
+            
+            shows = {}
+            for row in self.conn.execute(
+                    "SELECT rating_key, position, fields, " + self.COLUMNS + ", extra "
+                    "FROM shows ORDER BY position"):
+                rating_key, position, fields = row[0], row[1], row[2]
+                show_info = {}
+                for bit, field in enumerate(self.FIELDS):
+                    if not fields & (1 << bit):
+                        continue
+                    value = row[3 + bit]
+                    if field in self.LIST_FIELDS:
+                        value = list(map(vocab.__getitem__, map(int, value.split(',')))) if value else []
+                    elif field in self.INTERNED_FIELDS and value is not None:
+                        value = vocab[value]
+                    show_info[field] = value
+                if row[-1]:
+                    show_info.update(json.loads(row[-1]))
+                shows[rating_key] = show_info
+                self.next_position = position + 1
+            
+            meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        
+        if not shows and not meta and self.json_path and backup_exists(self.json_path):
+            cache = JSONShowStore(self.json_path).load()
+            if cache is not None:
+                print(f"{YELLOW}Migrating {len(cache.get('shows', {}))} shows from {os.path.basename(self.json_path)} "
+                      f"to {os.path.basename(self.path)}...{RESET}")
+                try:
+                    self.save(cache)
+                except sqlite3.Error as e:
+                    print(f"{YELLOW}Error migrating show cache: {e}{RESET}")
+                    self.needs_full_save = True
+                return cache
+        if not meta:
+            return None
+        return {
+            'shows': shows,
+            'last_updated': json.loads(meta.get('last_updated', 'null')),
+            'library_count': json.loads(meta.get('library_count', '0'))
+        }
+
+    def _write_show(self, rating_key: str, show_info: Dict):
+        fields = 0
+        columns = dict.fromkeys(self.FIELDS)
+        extra = {}
+        for key, value in show_info.items():
+            if key not in self.FIELDS:
+                extra[key] = value
+                continue
+            if key in self.LIST_FIELDS:
+                if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                    extra[key] = value
+                    continue
+                kind = self.LIST_FIELDS[key]
+                value = ','.join(str(self._intern(kind, v)) for v in value)
+            elif key in self.INTERNED_FIELDS and value is not None:
+                if not isinstance(value, str):
+                    extra[key] = value
+                    continue
+                value = self._intern(self.INTERNED_FIELDS[key], value)
+            columns[key] = value
+            fields |= 1 << self.FIELDS.index(key)
+        
+        self.conn.execute(
+            "INSERT INTO shows (rating_key, position, fields, " + self.COLUMNS + ", extra) "
+            "VALUES (" + ", ".join("?" * (len(self.FIELDS) + 4)) + ") "
+            "ON CONFLICT (rating_key) DO UPDATE SET fields = excluded.fields, "
+            + ", ".join(f'"{field}" = excluded."{field}"' for field in self.FIELDS) + ", extra = excluded.extra",
+            (rating_key, self.next_position, fields, *columns.values(),
+             json.dumps(extra, ensure_ascii=False) if extra else None)
+        )
+        self.next_position += 1
+
+    def save(self, cache: Dict, changed: Optional[Set[str]] = None, removed: Optional[Set[str]] = None):
+        """Write the given shows, or the whole cache when ``changed`` is None"""
+        shows = cache['shows']
+        with self.lock, self.conn:
+            if changed is None or self.needs_full_save:
+                self.conn.execute("DELETE FROM shows")
+                self.next_position = 0
+                changed = shows.keys()
+            self.conn.executemany("DELETE FROM shows WHERE rating_key = ?", ((key,) for key in removed or ()))
+            changed = set(changed)
+            # Cache order decides the position of new shows
+            for rating_key in shows:
+                if rating_key in changed:
+                    self._write_show(rating_key, shows[rating_key])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [('last_updated', json.dumps(cache.get('last_updated'))),
+                 ('library_count', json.dumps(cache.get('library_count', 0)))]
+            )
+        self.needs_full_save = False
+
+class JSONStateStore:
+    """Watched caches and Trakt sync state as JSON files (the original layout)"""
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.trakt_sync_cache_path = os.path.join(cache_dir, "trakt_sync_cache.json")
+
+    def watched_path(self, ctx: str) -> str:
+        return os.path.join(self.cache_dir, f"watched_cache_{ctx}.json")
+
+    def has_watched(self, ctx: str) -> bool:
+        return backup_exists(self.watched_path(ctx))
+
+    def load_watched(self, ctx: str) -> Dict:
+        data = load_json_with_backup(self.watched_path(ctx), "watched cache")
+        if data is None:
+            raise ValueError(f"no readable watched cache for {ctx}")
+        return data
+
+    def save_watched(self, ctx: str, data: Dict):
+        atomic_write_json(self.watched_path(ctx), data, indent=4, ensure_ascii=False)
+
+    def put_tmdb_ids(self, items) -> bool:
+        """Single entries can't be written to a JSON file; the caller saves the whole watched cache"""
+        return False
+
+    def put_tmdb_keywords(self, items) -> bool:
+        return False
+
+    def load_synced_episodes(self) -> Set[int]:
+        cache_data = load_json_with_backup(self.trakt_sync_cache_path, "Trakt sync cache") or {}
+        return {int(id) for id in cache_data.get('synced_episode_ids', []) if str(id).isdigit()}
+
+    def add_synced_episodes(self, tvdb_ids: Set[int]):
+        all_synced = self.load_synced_episodes() | set(tvdb_ids)
+        atomic_write_json(self.trakt_sync_cache_path, {
+            'synced_episode_ids': list(all_synced),
+            'last_sync': datetime.now().isoformat()
+        }, indent=4)
+
+    def clear_synced_episodes(self) -> bool:
+        if not backup_exists(self.trakt_sync_cache_path):
+            return False
+        # The backup goes too, or loading would fall back to it
+        for path in (self.trakt_sync_cache_path, f"{self.trakt_sync_cache_path}.bak"):
+            if os.path.exists(path):
+                os.remove(path)
+        return True
+
+class SQLiteStateStore(JSONStateStore):
+    """Watched caches and Trakt sync state in the shared SQLite cache database.
+
+    Per-user data is keyed by the user context. TMDB IDs, keyword sets and
+    synced episodes are shared by every user, and can be upserted one at a time.
+    A user's JSON watched cache and the JSON Trakt sync cache are imported the
+    first time they are needed.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS watched_meta (
+            ctx TEXT NOT NULL, key TEXT NOT NULL, value TEXT, PRIMARY KEY (ctx, key));
+        CREATE TABLE IF NOT EXISTS watched_shows (
+            ctx TEXT NOT NULL, rating_key INTEGER NOT NULL, PRIMARY KEY (ctx, rating_key)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS profile_counters (
+            ctx TEXT NOT NULL, category TEXT NOT NULL, feature TEXT NOT NULL, value REAL NOT NULL,
+            PRIMARY KEY (ctx, category, feature)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS watched_ledger (
+            ctx TEXT NOT NULL, rating_key TEXT NOT NULL, entry TEXT NOT NULL,
+            PRIMARY KEY (ctx, rating_key)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS plex_tmdb_ids (rating_key TEXT PRIMARY KEY, tmdb_id INTEGER);
+        CREATE TABLE IF NOT EXISTS tmdb_keywords (tmdb_id TEXT PRIMARY KEY, keywords TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS synced_episodes (tvdb_id INTEGER PRIMARY KEY);
+    """
+    META_KEYS = ('watched_count', 'last_updated', 'tautulli_history', 'counter_categories')
+
+    def __init__(self, cache_dir: str):
+        super().__init__(cache_dir)
+        self.conn = connect_cache_db(os.path.join(cache_dir, CACHE_DB_NAME))
+        self.conn.executescript(self.SCHEMA)
+        self.lock = threading.Lock()
+        self._import_trakt_sync_cache()
+
+    def _import_trakt_sync_cache(self):
+        if not backup_exists(self.trakt_sync_cache_path):
+            return
+        try:
+            synced = super().load_synced_episodes()
+            self.add_synced_episodes(synced)
+            # Renamed rather than kept, or clearing the table would bring the old IDs back on the next run
+            for path in (self.trakt_sync_cache_path, f"{self.trakt_sync_cache_path}.bak"):
+                if os.path.exists(path):
+                    os.replace(path, path + ".migrated")
+            print(f"{YELLOW}Imported {len(synced)} synced episode IDs into {CACHE_DB_NAME}{RESET}")
+        except Exception as e:
+            print(f"{YELLOW}Error importing Trakt sync cache: {e}{RESET}")
+
+    def has_watched(self, ctx: str) -> bool:
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM watched_meta WHERE ctx = ? LIMIT 1", (ctx,)).fetchone()
+        return row is not None or super().has_watched(ctx)
+
+    def load_watched(self, ctx: str) -> Dict:
+        with self.lock:
+            meta = dict(self.conn.execute("SELECT key, value FROM watched_meta WHERE ctx = ?", (ctx,)))
+        if not meta:
+            # First run on this database: import the user's JSON watched cache
+            data = super().load_watched(ctx)
+            self.save_watched(ctx, data)
+            print(f"{YELLOW}Imported {os.path.basename(self.watched_path(ctx))} into {CACHE_DB_NAME}{RESET}")
+            return data
+        
+        with self.lock:
+            data = {key: json.loads(value) for key, value in meta.items()}
+            # Categories are stored separately so empty ones survive the round trip
+            counters = {category: [] if category == 'tmdb_ids' else {}
+                        for category in data.pop('counter_categories', [])}
+            for category, feature, value in self.conn.execute(
+                    "SELECT category, feature, value FROM profile_counters WHERE ctx = ?", (ctx,)):
+                if category == 'tmdb_ids':
+                    counters.setdefault(category, []).append(int(feature) if feature.isdigit() else feature)
+                else:
+                    counters.setdefault(category, {})[feature] = value
+            data.update({
+                'watched_data_counters': counters,
+                'watched_ledger': {rating_key: json.loads(entry) for rating_key, entry in self.conn.execute(
+                    "SELECT rating_key, entry FROM watched_ledger WHERE ctx = ?", (ctx,))},
+                'watched_show_ids': [rating_key for (rating_key,) in self.conn.execute(
+                    "SELECT rating_key FROM watched_shows WHERE ctx = ?", (ctx,))],
+                'plex_tmdb_cache': dict(self.conn.execute("SELECT rating_key, tmdb_id FROM plex_tmdb_ids")),
+                'tmdb_keywords_cache': {tmdb_id: json.loads(keywords) for tmdb_id, keywords in self.conn.execute(
+                    "SELECT tmdb_id, keywords FROM tmdb_keywords")}
+            })
+        return data
+
+    def save_watched(self, ctx: str, data: Dict):
+        data = dict(data, counter_categories=list(data.get('watched_data_counters') or {}))
+        counters = []
+        for category, values in (data.get('watched_data_counters') or {}).items():
+            if category == 'tmdb_ids':
+                counters.extend((ctx, category, str(tmdb_id), 1.0) for tmdb_id in values)
+            else:
+                counters.extend((ctx, category, feature, value) for feature, value in values.items())
+        
+        with self.lock, self.conn:
+            for table in ('watched_shows', 'profile_counters', 'watched_ledger'):
+                self.conn.execute(f"DELETE FROM {table} WHERE ctx = ?", (ctx,))
+            self.conn.executemany(
+                "INSERT INTO watched_shows (ctx, rating_key) VALUES (?, ?)",
+                ((ctx, int(rating_key)) for rating_key in set(data.get('watched_show_ids', []))))
+            self.conn.executemany(
+                "INSERT INTO profile_counters (ctx, category, feature, value) VALUES (?, ?, ?, ?)", counters)
+            self.conn.executemany(
+                "INSERT INTO watched_ledger (ctx, rating_key, entry) VALUES (?, ?, ?)",
+                ((ctx, rating_key, json.dumps(entry, ensure_ascii=False))
+                 for rating_key, entry in (data.get('watched_ledger') or {}).items()))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO watched_meta (ctx, key, value) VALUES (?, ?, ?)",
+                ((ctx, key, json.dumps(data[key], ensure_ascii=False)) for key in self.META_KEYS if key in data))
+            self._upsert_tmdb_ids((data.get('plex_tmdb_cache') or {}).items())
+            self._upsert_tmdb_keywords((data.get('tmdb_keywords_cache') or {}).items())
+
+    def _upsert_tmdb_ids(self, items):
+        # Unchanged rows are left alone so a full save doesn't rewrite the shared tables
+        self.conn.executemany(
+            "INSERT INTO plex_tmdb_ids (rating_key, tmdb_id) VALUES (?, ?) "
+            "ON CONFLICT (rating_key) DO UPDATE SET tmdb_id = excluded.tmdb_id "
+            "WHERE tmdb_id IS NOT excluded.tmdb_id",
+            ((str(rating_key), tmdb_id) for rating_key, tmdb_id in items))
+
+    def _upsert_tmdb_keywords(self, items):
+        self.conn.executemany(
+            "INSERT INTO tmdb_keywords (tmdb_id, keywords) VALUES (?, ?) "
+            "ON CONFLICT (tmdb_id) DO UPDATE SET keywords = excluded.keywords "
+            "WHERE keywords IS NOT excluded.keywords",
+            ((str(tmdb_id), json.dumps(keywords, ensure_ascii=False)) for tmdb_id, keywords in items))
+
+    def put_tmdb_ids(self, items) -> bool:
+        with self.lock, self.conn:
+            self._upsert_tmdb_ids(items)
+        return True
+
+    def put_tmdb_keywords(self, items) -> bool:
+        with self.lock, self.conn:
+            self._upsert_tmdb_keywords(items)
+        return True
+
+    def load_synced_episodes(self) -> Set[int]:
+        with self.lock:
+            return {tvdb_id for (tvdb_id,) in self.conn.execute("SELECT tvdb_id FROM synced_episodes")}
+
+    def add_synced_episodes(self, tvdb_ids: Set[int]):
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO synced_episodes (tvdb_id) VALUES (?)",
+                                  ((int(tvdb_id),) for tvdb_id in tvdb_ids))
+
+    def clear_synced_episodes(self) -> bool:
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM synced_episodes").rowcount > 0
+
 class ShowCache:
-    def __init__(self, cache_dir: str, recommender=None):
+    def __init__(self, cache_dir: str, recommender=None, backend: str = 'json'):
         self.all_shows_cache_path = os.path.join(cache_dir, "all_shows_cache.json")
+        self.store = self._open_store(cache_dir, backend)
+        self.changed = set()
+        self.removed = set()
+        self.version = 0  # Bumped on every add/remove, so derived structures know to rebuild
         self.cache = self._load_cache()
         self.recommender = recommender  # Store reference to recommender
+        self._build_indexes()
+
+    def _open_store(self, cache_dir: str, backend: str):
+        if backend == 'sqlite':
+            try:
+                return SQLiteShowStore(os.path.join(cache_dir, CACHE_DB_NAME), self.all_shows_cache_path)
+            except sqlite3.Error as e:
+                print(f"{YELLOW}Could not open SQLite show cache ({e}). Using JSON instead.{RESET}")
+        elif backend != 'json':
+            print(f"{YELLOW}Unknown cache_backend '{backend}'. Using JSON.{RESET}")
+        return JSONShowStore(self.all_shows_cache_path)
         
     def _load_cache(self) -> Dict:
-        if os.path.exists(self.all_shows_cache_path):
-            try:
-                with open(self.all_shows_cache_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"{YELLOW}Error loading all shows cache: {e}{RESET}")
-                return {'shows': {}, 'last_updated': None, 'library_count': 0}
-        return {'shows': {}, 'last_updated': None, 'library_count': 0}
+        try:
+            cache = self.store.load()
+        except Exception as e:
+            print(f"{YELLOW}Error loading all shows cache: {e}{RESET}")
+            cache = None
+        return cache or {'shows': {}, 'last_updated': None, 'library_count': 0}
     
-    def update_cache(self, plex, library_title: str, tmdb_api_key: Optional[str] = None):
-        shows_section = plex.library.section(library_title)
-        all_shows = shows_section.all()
+    def _build_indexes(self):
+        """Build (title, year) and TMDB ID lookups over the cached shows"""
+        self.title_year_index = defaultdict(list)
+        self.tmdb_index = defaultdict(list)
+        for show_id, show_info in self.cache['shows'].items():
+            self._index_show(show_id, show_info)
+
+    def _index_show(self, show_id: str, show_info: Dict):
+        self.title_year_index[(show_info.get('title'), show_info.get('year'))].append(show_id)
+        if show_info.get('tmdb_id'):
+            self.tmdb_index[show_info['tmdb_id']].append(show_id)
+
+    def add_show(self, show_id: str, show_info: Dict):
+        """Add or replace a cached show, keeping its position and the indexes in sync"""
+        if show_id in self.cache['shows']:
+            self._unindex_show(show_id, self.cache['shows'][show_id])
+        self.cache['shows'][show_id] = show_info
+        self._index_show(show_id, show_info)
+        self.changed.add(show_id)
+        self.removed.discard(show_id)
+        self.version += 1
+
+    def _unindex_show(self, show_id: str, show_info: Dict):
+        for index, key in ((self.title_year_index, (show_info.get('title'), show_info.get('year'))),
+                           (self.tmdb_index, show_info.get('tmdb_id'))):
+            ids = index.get(key)
+            if ids and show_id in ids:
+                ids.remove(show_id)
+                if not ids:
+                    del index[key]
+
+    def remove_show(self, show_id: str):
+        show_info = self.cache['shows'].pop(show_id, None)
+        if show_info is not None:
+            self._unindex_show(show_id, show_info)
+            self.changed.discard(show_id)
+            self.removed.add(show_id)
+            self.version += 1
+
+    def get_rating_key(self, title: str, year: Optional[int]) -> Optional[str]:
+        """First cached ratingKey for a title/year, in cache order"""
+        ids = self.title_year_index.get((title, year))
+        return ids[0] if ids else None
+
+    def get_rating_key_by_tmdb_id(self, tmdb_id: int) -> Optional[str]:
+        ids = self.tmdb_index.get(tmdb_id)
+        return ids[0] if ids else None
+
+    @staticmethod
+    def _plex_timestamp(show) -> Optional[int]:
+        """Last modification time of a Plex item as epoch seconds (updatedAt, else addedAt)"""
+        value = getattr(show, 'updatedAt', None) or getattr(show, 'addedAt', None)
+        if isinstance(value, datetime):
+            return int(value.timestamp())
+        try:
+            return int(value) if value else None
+        except (TypeError, ValueError):
+            return None
+
+    def update_cache(self, library: LibrarySnapshot, tmdb_api_key: Optional[str] = None,
+                     max_workers: int = 1, tmdb: Optional[TMDBClient] = None):
+        all_shows = library.shows
         current_count = len(all_shows)
         
-        if current_count == self.cache['library_count']:
+        current_shows = set(str(show.ratingKey) for show in all_shows)
+        removed = set(self.cache['shows'].keys()) - current_shows
+        
+        # Compare Plex timestamps with the ones stored at the last sync
+        stale_shows = []
+        new_count = 0
+        backfilled = 0
+        for show in all_shows:
+            show_id = str(show.ratingKey)
+            cached = self.cache['shows'].get(show_id)
+            if cached is None:
+                stale_shows.append(show)
+                new_count += 1
+            elif 'updated_at' not in cached:
+                # Entries from older versions: record the timestamp without re-fetching
+                cached['updated_at'] = self._plex_timestamp(show)
+                self.changed.add(show_id)
+                backfilled += 1
+            elif cached['updated_at'] != self._plex_timestamp(show):
+                stale_shows.append(show)
+        
+        if not removed and not stale_shows:
+            if backfilled or current_count != self.cache['library_count']:
+                self.cache['library_count'] = current_count
+                self._save_cache()
             print(f"{GREEN}Show cache is up to date{RESET}")
             return False
             
         print(f"\n{YELLOW}Analyzing library shows...{RESET}")
         
-        current_shows = set(str(show.ratingKey) for show in all_shows)
-        removed = set(self.cache['shows'].keys()) - current_shows
-        
         if removed:
             print(f"{YELLOW}Removing {len(removed)} shows from cache that are no longer in library{RESET}")
             for show_id in removed:
-                del self.cache['shows'][show_id]
+                self.remove_show(show_id)
         
-        existing_ids = set(self.cache['shows'].keys())
-        new_shows = [show for show in all_shows if str(show.ratingKey) not in existing_ids]
-        
-        if new_shows:
-            print(f"Found {len(new_shows)} new shows to analyze")
+        if stale_shows:
+            changed_count = len(stale_shows) - new_count
+            print(f"Found {new_count} new and {changed_count} changed shows to analyze")
+            self.tmdb = tmdb or TMDBClient(tmdb_api_key)
             
-            for i, show in enumerate(new_shows, 1):
-                msg = f"\r{CYAN}Processing show {i}/{len(new_shows)} ({int((i/len(new_shows))*100)}%){RESET}"
-                sys.stdout.write(msg)
-                sys.stdout.flush()
-                
-                show_id = str(show.ratingKey)
-                try:
-                    show.reload()
-                    
-                    # Add delay between shows
-                    if i > 1 and tmdb_api_key:
-                        time.sleep(0.5)  # Basic rate limiting
-                    
-                    imdb_id = None
-                    tmdb_id = None
-                    if hasattr(show, 'guids'):
-                        for guid in show.guids:
-                            if 'imdb://' in guid.id:
-                                imdb_id = guid.id.replace('imdb://', '')
-                            elif 'themoviedb://' in guid.id:
-                                try:
-                                    tmdb_id = int(guid.id.split('themoviedb://')[1].split('?')[0])
-                                except (ValueError, IndexError):
-                                    pass
-                    
-                    # TMDB ID search with retries
-                    if not tmdb_id and tmdb_api_key:
-                        max_retries = 3
-                        for attempt in range(max_retries):
-                            try:
-                                params = {
-                                    'api_key': tmdb_api_key,
-                                    'query': show.title,
-                                    'first_air_date_year': getattr(show, 'year', None)
-                                }
-                                resp = requests.get(
-                                    "https://api.themoviedb.org/3/search/tv",
-                                    params=params,
-                                    timeout=15
-                                )
-                                
-                                if resp.status_code == 429:
-                                    sleep_time = 2 * (attempt + 1)
-                                    print(f"{YELLOW}TMDB rate limit hit, waiting {sleep_time}s...{RESET}")
-                                    time.sleep(sleep_time)
-                                    continue
-                                    
-                                if resp.status_code == 200:
-                                    results = resp.json().get('results', [])
-                                    if results:
-                                        tmdb_id = results[0]['id']
-                                    break
-                                    
-                            except (requests.exceptions.ConnectionError, 
-                                   requests.exceptions.Timeout,
-                                   requests.exceptions.ChunkedEncodingError) as e:
-                                print(f"{YELLOW}Connection error, retrying... ({attempt+1}/{max_retries}){RESET}")
-                                time.sleep(1)
-                                if attempt == max_retries - 1:
-                                    print(f"{YELLOW}Failed to get TMDB ID for {show.title} after {max_retries} tries{RESET}")
-                            except Exception as e:
-                                print(f"{YELLOW}Error getting TMDB ID for {show.title}: {e}{RESET}")
-                                break
-    
-                    tmdb_keywords = []
-                    if tmdb_id and tmdb_api_key:
-                        max_retries = 3
-                        for attempt in range(max_retries):
-                            try:
-                                kw_resp = requests.get(
-                                    f"https://api.themoviedb.org/3/tv/{tmdb_id}/keywords",
-                                    params={'api_key': tmdb_api_key},
-                                    timeout=15
-                                )
-                                
-                                if kw_resp.status_code == 429:
-                                    sleep_time = 2 * (attempt + 1)
-                                    print(f"{YELLOW}TMDB rate limit hit, waiting {sleep_time}s...{RESET}")
-                                    time.sleep(sleep_time)
-                                    continue
-                                    
-                                if kw_resp.status_code == 200:
-                                    keywords = kw_resp.json().get('results', [])
-                                    tmdb_keywords = [k['name'].lower() for k in keywords]
-                                    break
-                                    
-                            except (requests.exceptions.ConnectionError,
-                                   requests.exceptions.Timeout,
-                                   requests.exceptions.ChunkedEncodingError) as e:
-                                print(f"{YELLOW}Connection error, retrying... ({attempt+1}/{max_retries}){RESET}")
-                                time.sleep(1)
-                                if attempt == max_retries - 1:
-                                    print(f"{YELLOW}Failed to get keywords for {show.title} after {max_retries} tries{RESET}")
-                            except Exception as e:
-                                print(f"{YELLOW}Error getting TMDB keywords for {show.title}: {e}{RESET}")
-                                break
-    
-                    # Store in recommender's caches if available
-                    if self.recommender and tmdb_id:
-                        self.recommender.plex_tmdb_cache[str(show.ratingKey)] = tmdb_id
-                        if tmdb_keywords:
-                            self.recommender.tmdb_keywords_cache[str(tmdb_id)] = tmdb_keywords
-                    
-                    show_info = {
-                        'title': show.title,
-                        'year': getattr(show, 'year', None),
-                        'genres': [g.tag.lower() for g in show.genres] if hasattr(show, 'genres') else [],
-                        'studio': getattr(show, 'studio', 'N/A'),
-                        'cast': [r.tag for r in show.roles[:3]] if hasattr(show, 'roles') else [],
-                        'summary': getattr(show, 'summary', ''),
-                        'language': self._get_show_language(show),
-                        'tmdb_keywords': tmdb_keywords,
-                        'tmdb_id': tmdb_id,
-                        'imdb_id': imdb_id
-                    }
-                    self.cache['shows'][show_id] = show_info
-                    
-                except Exception as e:
-                    print(f"{YELLOW}Error processing show {show.title}: {e}{RESET}")
+            if max_workers > 1:
+                results = self._fetch_shows_concurrently(stale_shows, tmdb_api_key, max_workers)
+            else:
+                results = []
+                for i, show in enumerate(stale_shows, 1):
+                    msg = f"\r{CYAN}Processing show {i}/{len(stale_shows)} ({int((i/len(stale_shows))*100)}%){RESET}"
+                    sys.stdout.write(msg)
+                    sys.stdout.flush()
+                    results.append(self._fetch_show_info(show, tmdb_api_key))
+            
+            # Apply results in library order so the cache file is identical to a serial run
+            for show, show_info in zip(stale_shows, results):
+                if show_info is None:
                     continue
+                tmdb_id = show_info['tmdb_id']
+                show_info['updated_at'] = self._plex_timestamp(show)
+                
+                # Store in recommender's caches if available
+                if self.recommender and tmdb_id:
+                    self.recommender.plex_tmdb_cache[str(show.ratingKey)] = tmdb_id
+                    if show_info['tmdb_keywords']:
+                        self.recommender.tmdb_keywords_cache[str(tmdb_id)] = show_info['tmdb_keywords']
+                
+                self.add_show(str(show.ratingKey), show_info)
                     
         self.cache['library_count'] = current_count
         self.cache['last_updated'] = datetime.now().isoformat()
         self._save_cache()
         print(f"\n{GREEN}Show cache updated{RESET}")
         return True
+
+    def _fetch_shows_concurrently(self, shows: List, tmdb_api_key: Optional[str], max_workers: int) -> List[Optional[Dict]]:
+        """Fetch show info with a bounded worker pool, returning results in input order"""
+        results = [None] * len(shows)
+        done = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_show_info, show, tmdb_api_key): i
+                for i, show in enumerate(shows)
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                done += 1
+                msg = f"\r{CYAN}Processing show {done}/{len(shows)} ({int((done/len(shows))*100)}%){RESET}"
+                sys.stdout.write(msg)
+                sys.stdout.flush()
+        return results
+
+    def _fetch_show_info(self, show, tmdb_api_key: Optional[str]) -> Optional[Dict]:
+        """Reload a show from Plex and build its cache entry, or None on failure"""
+        try:
+            show.reload()
+            
+            imdb_id = None
+            tmdb_id = None
+            if hasattr(show, 'guids'):
+                for guid in show.guids:
+                    if 'imdb://' in guid.id:
+                        imdb_id = guid.id.replace('imdb://', '')
+                    elif 'themoviedb://' in guid.id:
+                        try:
+                            tmdb_id = int(guid.id.split('themoviedb://')[1].split('?')[0])
+                        except (ValueError, IndexError):
+                            pass
+            
+            if not tmdb_id and tmdb_api_key:
+                params = {
+                    'query': show.title,
+                    'first_air_date_year': getattr(show, 'year', None)
+                }
+                data = self._tmdb_get("/search/tv", params, show.title, "TMDB ID")
+                if data and data.get('results'):
+                    tmdb_id = data['results'][0]['id']
+    
+            tmdb_keywords = []
+            if tmdb_id and tmdb_api_key:
+                data = self._tmdb_get(f"/tv/{tmdb_id}/keywords", None, show.title, "keywords")
+                if data:
+                    tmdb_keywords = [k['name'].lower() for k in data.get('results', [])]
+            
+            return {
+                'title': show.title,
+                'year': getattr(show, 'year', None),
+                'genres': [g.tag.lower() for g in show.genres] if hasattr(show, 'genres') else [],
+                'studio': getattr(show, 'studio', 'N/A'),
+                'cast': [r.tag for r in show.roles[:3]] if hasattr(show, 'roles') else [],
+                'summary': getattr(show, 'summary', ''),
+                'language': self._get_show_language(show),
+                'tmdb_keywords': tmdb_keywords,
+                'tmdb_id': tmdb_id,
+                'imdb_id': imdb_id
+            }
+            
+        except Exception as e:
+            print(f"{YELLOW}Error processing show {show.title}: {e}{RESET}")
+            return None
+
+    def _tmdb_get(self, path: str, params: Optional[Dict], title: str, what: str) -> Optional[Dict]:
+        """GET a TMDB endpoint through the shared client, returning the JSON body or None"""
+        try:
+            return self.tmdb.get_json(path, params)
+        except requests.exceptions.RequestException as e:
+            print(f"{YELLOW}Failed to get {what} for {title}: {e}{RESET}")
+        except Exception as e:
+            print(f"{YELLOW}Error getting {what} for {title}: {e}{RESET}")
+        return None
         
     def _save_cache(self):
         try:
-            with open(self.all_shows_cache_path, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=4, ensure_ascii=False)
+            self.store.save(self.cache, self.changed, self.removed)
+            self.changed = set()
+            self.removed = set()
         except Exception as e:
             print(f"{RED}Error saving all shows cache: {e}{RESET}")
 
@@ -301,29 +1423,155 @@ class ShowCache:
             print(f"DEBUG: Language detection failed: {str(e)}")
         return "N/A"
 
+class UserProfile:
+    """Watch profile compiled once per run for fast similarity scoring.
+
+    Each category maps a feature to ``(count, normalized_score)`` where the
+    score is already scaled against the category maximum (square root when
+    ``normalize_counters`` is on, linear otherwise), so scoring a show only
+    needs dictionary lookups over that show's own attributes.
+    """
+    CATEGORIES = {
+        'genres': 'genres',
+        'studio': 'studio',
+        'actors': 'actors',
+        'languages': 'languages',
+        'keywords': 'tmdb_keywords'
+    }
+
+    def __init__(self, watched_data: Dict, normalize_counters: bool = True):
+        self.source = watched_data
+        self.normalize_counters = normalize_counters
+        self.weights = {}
+        for category, counter_key in self.CATEGORIES.items():
+            counts = Counter(watched_data.get(counter_key, {}))
+            max_count = max(counts.values()) if counts else 1
+            prefs = {}
+            for feature, count in counts.items():
+                if count > 0:
+                    if normalize_counters:
+                        normalized_score = math.sqrt(count / max_count)
+                    else:
+                        normalized_score = min(count / max_count, 1.0)
+                    prefs[feature] = (count, normalized_score)
+            self.weights[category] = prefs
+
+class ShowFeatureMatrix:
+    """Sparse encoding of the show cache for vectorized scoring (requires NumPy).
+
+    Every category keeps a vocabulary plus parallel ``rows``/``cols`` arrays
+    listing which feature each show carries, in the same order the per-show
+    scorer walks them, so summing with ``np.bincount`` reproduces its scores.
+    """
+    def __init__(self, shows: Dict[str, Dict], version: int = 0):
+        self.version = version
+        self.show_ids = list(shows.keys())
+        self.row_of = {show_id: row for row, show_id in enumerate(self.show_ids)}
+        self.vocab = {category: {} for category in UserProfile.CATEGORIES}
+        entries = {category: ([], []) for category in UserProfile.CATEGORIES}
+        
+        for row, show_info in enumerate(shows.values()):
+            features = {
+                'genres': set(show_info.get('genres') or []),
+                'studio': [],
+                'actors': show_info.get('cast') or [],
+                'languages': [],
+                'keywords': show_info.get('tmdb_keywords') or []
+            }
+            if show_info.get('studio') and show_info['studio'] != 'N/A':
+                features['studio'] = [show_info['studio'].lower()]
+            language = show_info.get('language') or 'N/A'
+            if language != 'N/A':
+                features['languages'] = [language.lower()]
+            
+            for category, values in features.items():
+                vocab = self.vocab[category]
+                rows, cols = entries[category]
+                for value in values:
+                    rows.append(row)
+                    cols.append(vocab.setdefault(value, len(vocab)))
+        
+        self.entries = {
+            category: (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))
+            for category, (rows, cols) in entries.items()
+        }
+
+    def _category_sums(self, category: str, profile: UserProfile) -> Tuple:
+        """Per-show sum of normalized scores and number of matched features"""
+        vocab = self.vocab[category]
+        norms = np.zeros(len(vocab))
+        matched = np.zeros(len(vocab))
+        for feature, (_, normalized_score) in profile.weights[category].items():
+            col = vocab.get(feature)
+            if col is not None:
+                norms[col] = normalized_score
+                matched[col] = 1.0
+        rows, cols = self.entries[category]
+        n = len(self.show_ids)
+        sums = np.bincount(rows, weights=norms[cols], minlength=n)
+        hits = np.bincount(rows, weights=matched[cols], minlength=n)
+        return sums, hits
+
+    def score(self, profile: UserProfile, weights: Dict, use_keywords: bool = True):
+        """Similarity score for every show in the matrix, matching _calculate_similarity_from_cache"""
+        score = np.zeros(len(self.show_ids))
+        
+        sums, hits = self._category_sums('genres', profile)
+        score += np.where(hits > 0, sums / np.maximum(hits, 1), 0.0) * weights.get('genre_weight', 0.25)
+        
+        sums, _ = self._category_sums('studio', profile)
+        score += sums * weights.get('studio_weight', 0.20)
+        
+        sums, hits = self._category_sums('actors', profile)
+        actor_score = np.where(hits > 0, sums / np.maximum(hits, 1), 0.0)
+        actor_score = np.where(hits > 3, actor_score * (3 / np.maximum(hits, 1)), actor_score)
+        score += actor_score * weights.get('actor_weight', 0.20)
+        
+        sums, _ = self._category_sums('languages', profile)
+        score += sums * weights.get('language_weight', 0.10)
+        
+        if use_keywords:
+            sums, hits = self._category_sums('keywords', profile)
+            score += np.where(hits > 0, sums / np.maximum(hits, 1), 0.0) * weights.get('keyword_weight', 0.25)
+        
+        return np.minimum(score, 1.0)
+
 class PlexTVRecommender:
-    def __init__(self, config_path: str, single_user: str = None):
+    def __init__(self, config_path: str, single_user: str = None, shared: Optional['PlexTVRecommender'] = None):
+        if shared is None:
+            self._init_shared(config_path)
+        else:
+            # Reuse the Plex connection, API clients, show cache and settings of the shared instance
+            self.__dict__.update(shared.__dict__)
         self.single_user = single_user
+        self._init_user()
+
+    @classmethod
+    def shared_context(cls, config_path: str) -> 'PlexTVRecommender':
+        """Set up everything that does not depend on the user, for use as ``shared``"""
+        shared = cls.__new__(cls)
+        shared.single_user = None
+        shared._init_shared(config_path)
+        return shared
+
+    def _init_shared(self, config_path: str):
         self.config = self._load_config(config_path)
         self.library_title = self.config['plex'].get('TV_library_title', 'TV Shows')
-        
-        # Initialize counters and caches
-        self.cached_watched_count = 0
-        self.cached_unwatched_count = 0
-        self.cached_library_show_count = 0
-        self.watched_data_counters = {}
-        self.synced_show_ids = set()
-        self.cached_unwatched_shows = []
+        self.account = None
         self.plex_tmdb_cache = {}
         self.tmdb_keywords_cache = {}
-        self.tautulli_watched_rating_keys = set()
-        self.watched_show_ids = set()
         self.users = self._get_configured_users()
     
         print("Initializing recommendation system...")
         if self.config.get('tautulli', {}).get('users'):
             if not self.config['tautulli'].get('url') or not self.config['tautulli'].get('api_key'):
                 raise ValueError("Tautulli configuration requires both url and api_key when users are specified")        
+        tautulli_config = self.config.get('tautulli') or {}
+        self.tautulli = None
+        if tautulli_config.get('url') and tautulli_config.get('api_key'):
+            self.tautulli = TautulliClient(tautulli_config['url'], tautulli_config['api_key'])
+        self.tautulli_grouping = bool(tautulli_config.get('history_grouping', False))
+        self.tautulli_verify_grouping = bool(tautulli_config.get('verify_history_grouping', False))
         
         print("Connecting to Plex server...")
         self.plex = self._init_plex()
@@ -337,8 +1585,27 @@ class PlexTVRecommender:
 		
         self.cache_dir = os.path.join(os.path.dirname(__file__), "cache")
         os.makedirs(self.cache_dir, exist_ok=True)
-        self.show_cache = ShowCache(self.cache_dir, recommender=self)
-        self.show_cache.update_cache(self.plex, self.library_title, self.tmdb_api_key)
+        self.max_workers = max(1, int(general_config.get('max_workers', 1)))
+        response_cache = None
+        if int(tmdb_config.get('response_cache_size', 20000)) > 0:
+            response_cache = ResponseCache(
+                os.path.join(self.cache_dir, "tmdb_response_cache.json"),
+                TMDB_CACHE_TTLS,
+                max_entries=int(tmdb_config.get('response_cache_size', 20000))
+            )
+        self.tmdb = TMDBClient(
+            self.tmdb_api_key,
+            float(tmdb_config.get('requests_per_second', 10)),
+            response_cache=response_cache
+        )
+        self.library_snapshot = LibrarySnapshot(self.plex, self.library_title)
+        self.cache_backend = str(general_config.get('cache_backend', 'json')).lower()
+        self.show_cache = ShowCache(self.cache_dir, recommender=self, backend=self.cache_backend)
+        self.episode_index = EpisodeIndex(self.cache_dir, self.plex)
+        self.show_cache.update_cache(
+            self.library_snapshot, self.tmdb_api_key,
+            max_workers=self.max_workers, tmdb=self.tmdb
+        )
 
         self.confirm_operations = general_config.get('confirm_operations', False)
         self.limit_plex_results = general_config.get('limit_plex_results', 10)
@@ -352,6 +1619,11 @@ class PlexTVRecommender:
         self.show_language = general_config.get('show_language', False)
         self.show_rating = general_config.get('show_rating', False)
         self.show_imdb_link = general_config.get('show_imdb_link', False)
+        self.vectorized_scoring = general_config.get('vectorized_scoring', False)
+        if self.vectorized_scoring and np is None:
+            print(f"{YELLOW}vectorized_scoring requires numpy (pip install numpy). Falling back to standard scoring.{RESET}")
+            self.vectorized_scoring = False
+        self.scoring_processes = max(1, int(general_config.get('scoring_processes', 1)))
         
         exclude_genre_str = general_config.get('exclude_genre', '')
         self.exclude_genres = [g.strip().lower() for g in exclude_genre_str.split(',') if g.strip()] if exclude_genre_str else []
@@ -371,6 +1643,7 @@ class PlexTVRecommender:
 			
         trakt_config = self.config.get('trakt', {})
         self.sync_watch_history = trakt_config.get('sync_watch_history', False)
+        self.trakt = TraktClient(float(trakt_config.get('requests_per_second', 3)))
         self.trakt_headers = {
             'Content-Type': 'application/json',
             'trakt-api-version': '2',
@@ -381,6 +1654,36 @@ class PlexTVRecommender:
         else:
             self._authenticate_trakt()
 
+        # Verify library exists
+        if not self.library_snapshot.section:
+            raise ValueError(f"TV Show library '{self.library_title}' not found in Plex")
+
+        self.sonarr_config = self.config.get('sonarr', {})
+
+    def _init_user(self):
+        # Initialize counters and caches
+        self.cached_watched_count = 0
+        self.cached_unwatched_count = 0
+        self.cached_library_show_count = 0
+        self.watched_data_counters = {}
+        self.watched_ledger = {}
+        self._watched_show_keys = None
+        self.cached_unwatched_shows = []
+        self.plex_tmdb_cache = dict(self.plex_tmdb_cache)
+        self.tmdb_keywords_cache = dict(self.tmdb_keywords_cache)
+        self.tautulli_watched_rating_keys = set()
+        self.watched_show_ids = set()
+        self.user_profile = None
+        self.pending_tmdb_ids = set()
+        self.pending_tmdb_keywords = set()
+        self.watched_cache_flushed_at = time.time()
+        self.tautulli_history = TautulliHistoryLoader(
+            self.tautulli,
+            grouping=self.tautulli_grouping,
+            verify=self.tautulli_verify_grouping
+        ) if self.tautulli else None
+        single_user = self.single_user
+
         # Verify Tautulli/Plex user mapping
         if self.users['tautulli_users']:
             users_to_validate = [self.single_user] if self.single_user else self.users['tautulli_users']
@@ -390,39 +1693,28 @@ class PlexTVRecommender:
                 print(f"{YELLOW}Using watch history for all Tautulli users{RESET}")
             else:
                 try:
-                    test_params = {'apikey': self.config['tautulli']['api_key'], 'cmd': 'get_users'}
-                    users_response = requests.get(f"{self.config['tautulli']['url']}/api/v2", params=test_params)
-                    if users_response.status_code == 200:
-                        tautulli_users = users_response.json()['response']['data']
-                        tautulli_usernames = [u['username'] for u in tautulli_users]
-                        missing = [u for u in users_to_validate if u not in tautulli_usernames]
-                        
-                        if missing:
-                            # Check for case-insensitive matches
-                            for missing_user in missing:
-                                close_matches = [t for t in tautulli_usernames 
-                                               if t.lower() == missing_user.lower()]
-                                if close_matches:
-                                    print(f"\n{RED}Error: User '{missing_user}' not found, but found similar username: "
-                                          f"'{close_matches[0]}'{RESET}")
-                                    print(f"Tautulli usernames are case-sensitive. Please update your config file "
-                                          f"to match the exact username.")
-                                else:
-                                    print(f"\n{RED}Error: User '{missing_user}' not found in Tautulli.{RESET}")
-                                    print("Available Tautulli users:")
-                                    for username in tautulli_usernames:
-                                        print(f"- {username}")
-                            raise ValueError("Please check your Tautulli usernames and ensure they match exactly.")
+                    tautulli_users = self.tautulli_history.users()
+                    tautulli_usernames = [u['username'] for u in tautulli_users]
+                    missing = [u for u in users_to_validate if u not in tautulli_usernames]
+                    
+                    if missing:
+                        # Check for case-insensitive matches
+                        for missing_user in missing:
+                            close_matches = [t for t in tautulli_usernames 
+                                           if t.lower() == missing_user.lower()]
+                            if close_matches:
+                                print(f"\n{RED}Error: User '{missing_user}' not found, but found similar username: "
+                                      f"'{close_matches[0]}'{RESET}")
+                                print(f"Tautulli usernames are case-sensitive. Please update your config file "
+                                      f"to match the exact username.")
+                            else:
+                                print(f"\n{RED}Error: User '{missing_user}' not found in Tautulli.{RESET}")
+                                print("Available Tautulli users:")
+                                for username in tautulli_usernames:
+                                    print(f"- {username}")
+                        raise ValueError("Please check your Tautulli usernames and ensure they match exactly.")
                 except requests.exceptions.RequestException as e:
                     raise ValueError(f"Error connecting to Tautulli: {e}")
-
-        # Verify library exists
-        if not self.plex.library.section(self.library_title):
-            raise ValueError(f"TV Show library '{self.library_title}' not found in Plex")
-        
-
-
-        self.sonarr_config = self.config.get('sonarr', {})
         
         # Get user context for cache files
         if single_user:
@@ -434,40 +1726,46 @@ class PlexTVRecommender:
                 user_ctx = 'plex_' + '_'.join(self.users['managed_users'])
         
         safe_ctx = re.sub(r'\W+', '', user_ctx)
+        self.watched_ctx = safe_ctx
+        
+        # Each user gets their own store connection so profiles can be built concurrently
+        self.state_store = self._open_state_store()
         
         # Update cache paths to be user-specific
-        self.watched_cache_path = os.path.join(self.cache_dir, f"watched_cache_{safe_ctx}.json")
+        self.watched_cache_path = self.state_store.watched_path(safe_ctx)
         self.trakt_cache_path = os.path.join(self.cache_dir, f"trakt_sync_cache_{safe_ctx}.json")
-        self.trakt_sync_cache_path = os.path.join(self.cache_dir, "trakt_sync_cache.json")
+        self.trakt_sync_cache_path = self.state_store.trakt_sync_cache_path
          
         # Load watched cache 
         watched_cache = {}
-        if os.path.exists(self.watched_cache_path):
+        if self.state_store.has_watched(safe_ctx):
             try:
-                with open(self.watched_cache_path, 'r', encoding='utf-8') as f:
-                    watched_cache = json.load(f)
-                    self.cached_watched_count = watched_cache.get('watched_count', 0)
-                    self.watched_data_counters = watched_cache.get('watched_data_counters', {})
-                    self.plex_tmdb_cache = {str(k): v for k, v in watched_cache.get('plex_tmdb_cache', {}).items()}
-                    self.tmdb_keywords_cache = {str(k): v for k, v in watched_cache.get('tmdb_keywords_cache', {}).items()}
-                    
-                    # Load watched show IDs
-                    watched_ids = watched_cache.get('watched_show_ids', [])
-                    if isinstance(watched_ids, list):
-                        self.watched_show_ids = {int(id_) for id_ in watched_ids if str(id_).isdigit()}
-                    else:
-                        print(f"{YELLOW}Warning: Invalid watched_show_ids format in cache{RESET}")
-                        self.watched_show_ids = set()
-                    
-                    if not self.watched_show_ids and self.cached_watched_count > 0:
-                        print(f"{RED}Warning: Cached watched count is {self.cached_watched_count} but no valid IDs loaded{RESET}")
-                        # Force a refresh of watched data
-                        self._refresh_watched_data()
-                    
+                watched_cache = self.state_store.load_watched(safe_ctx)
+                if self.tautulli_history:
+                    self.tautulli_history.load_state(watched_cache.get('tautulli_history', {}))
+                self.cached_watched_count = watched_cache.get('watched_count', 0)
+                self.watched_data_counters = watched_cache.get('watched_data_counters', {})
+                self.watched_ledger = watched_cache.get('watched_ledger', {})
+                self.plex_tmdb_cache = {str(k): v for k, v in watched_cache.get('plex_tmdb_cache', {}).items()}
+                self.tmdb_keywords_cache = {str(k): v for k, v in watched_cache.get('tmdb_keywords_cache', {}).items()}
+                
+                # Load watched show IDs
+                watched_ids = watched_cache.get('watched_show_ids', [])
+                if isinstance(watched_ids, list):
+                    self.watched_show_ids = {int(id_) for id_ in watched_ids if str(id_).isdigit()}
+                else:
+                    print(f"{YELLOW}Warning: Invalid watched_show_ids format in cache{RESET}")
+                    self.watched_show_ids = set()
+                
+                if not self.watched_show_ids and self.cached_watched_count > 0:
+                    print(f"{RED}Warning: Cached watched count is {self.cached_watched_count} but no valid IDs loaded{RESET}")
+                    # Force a refresh of watched data
+                    self._refresh_watched_data()
+                
             except Exception as e:
                 print(f"{YELLOW}Error loading watched cache: {e}{RESET}")
                 self._refresh_watched_data()  
-        current_library_ids = self._get_library_shows_set()
+        current_library_ids = self.library_snapshot.rating_keys
         
         # Clean up both watched show tracking mechanisms
         self.tautulli_watched_rating_keys = {
@@ -487,16 +1785,22 @@ class PlexTVRecommender:
             self.synced_trakt_history = {}
 
         current_watched_count = self._get_watched_count()
-        cache_exists = os.path.exists(self.watched_cache_path)
+        cache_exists = self.state_store.has_watched(self.watched_ctx)
         
         if (not cache_exists) or (current_watched_count != self.cached_watched_count):
-            print("Watched count changed or no cache found; gathering watched data now. This may take a while...\n")
-            if self.users['tautulli_users']:
-                print("Using Tautulli users for watch history")
-                self.watched_data = self._get_tautulli_watched_shows_data()
+            if cache_exists and self.watched_ledger and self.watched_data_counters:
+                print("Watched count changed; updating watched data from the changed shows...\n")
+                self.watched_data = self._update_watched_counters(self._get_watched_show_keys())
             else:
-                print("Using managed users for watch history")
-                self.watched_data = self._get_managed_users_watched_data()
+                print("Watched count changed or no cache found; gathering watched data now. This may take a while...\n")
+                # Rebuild from scratch; this also seeds the ledger for caches written without one
+                self.watched_data_counters = {}
+                if self.users['tautulli_users']:
+                    print("Using Tautulli users for watch history")
+                    self.watched_data = self._get_tautulli_watched_shows_data()
+                else:
+                    print("Using managed users for watch history")
+                    self.watched_data = self._get_managed_users_watched_data()
             self.watched_data_counters = self.watched_data
             self.cached_watched_count = current_watched_count
             self._save_watched_cache()
@@ -508,10 +1812,14 @@ class PlexTVRecommender:
                 self.watched_show_ids = {int(id_) for id_ in watched_cache['watched_show_ids'] if str(id_).isdigit()}
             if self.debug:
                 print(f"DEBUG: Loaded {len(self.watched_show_ids)} watched show IDs from cache")
+            if self.tautulli_history and self.tautulli_history.dirty:
+                # Persist new history rows and the cursor even when the show count is unchanged
+                self._save_watched_cache()
             
         print("Fetching library metadata (for existing Shows checks)...")
         self.library_shows = self._get_library_shows_set()
         self.library_imdb_ids = self._get_library_imdb_ids()
+        self.library_ids = self.library_snapshot.external_ids
  
     # ------------------------------------------------------------------------
     # CONFIG / SETUP
@@ -557,7 +1865,7 @@ class PlexTVRecommender:
                 tautulli_users = [u.strip() for u in tautulli_user_config.split(',') if u.strip()]
         
         # Resolve admin account
-        account = MyPlexAccount(token=self.config['plex']['token'])
+        account = self._get_account()
         admin_user = account.username
         
         # User validation logic
@@ -590,6 +1898,11 @@ class PlexTVRecommender:
             'admin_user': admin_user
         }
 
+    def _get_account(self) -> MyPlexAccount:
+        if self.account is None:
+            self.account = MyPlexAccount(token=self.config['plex']['token'])
+        return self.account
+
     def _get_current_users(self) -> str:
         if self.users['tautulli_users']:
             return f"Tautulli users: {', '.join(self.users['tautulli_users'])}"
@@ -599,71 +1912,30 @@ class PlexTVRecommender:
         if self.users['tautulli_users']:
             return self.plex
         try:
-            account = MyPlexAccount(token=self.config['plex']['token'])
+            account = self._get_account()
             user = account.user(self.users['managed_users'][0])
             return self.plex.switchUser(user)
         except:
             return self.plex
 
     def _get_watched_count(self) -> int:
+        return len(self._get_watched_show_keys())
+
+    def _get_watched_show_keys(self) -> Dict[str, int]:
+        """Watched show ratingKeys mapped to how many configured users watched them"""
+        if self._watched_show_keys is not None:
+            return self._watched_show_keys
+        
+        watched_keys = {}
         if self.users['tautulli_users']:
-            user_ids = []
-            try:
-                users_response = requests.get(
-                    f"{self.config['tautulli']['url']}/api/v2",
-                    params={'apikey': self.config['tautulli']['api_key'], 'cmd': 'get_users'}
-                )
-                tautulli_users = users_response.json()['response']['data']
-                
-                # Only process specified user in single user mode
-                users_to_check = [self.single_user] if self.single_user else self.users['tautulli_users']
-                
-                for username in users_to_check:
-                    user = next((u for u in tautulli_users 
-                               if u['username'].lower() == username.lower()), None)
-                    if user:
-                        user_ids.append(str(user['user_id']))
-            except Exception as e:
-                print(f"{YELLOW}Error resolving users: {e}{RESET}")
-                return 0
-    
-            grandparent_keys = set()
-            for user_id in user_ids:
-                start = 0
-                while True:
-                    params = {
-                        'apikey': self.config['tautulli']['api_key'],
-                        'cmd': 'get_history',
-                        'media_type': 'episode',
-                        'user_id': user_id,
-                        'length': 1000,
-                        'start': start
-                    }
-                    response = requests.get(f"{self.config['tautulli']['url']}/api/v2", params=params)
-                    data = response.json()['response']['data']
-                    
-                    if isinstance(data, dict):
-                        page_items = data.get('data', [])
-                        total_records = data.get('recordsFiltered', 0)
-                    else:
-                        page_items = data
-                        total_records = len(page_items)
-                    
-                    for item in page_items:
-                        if item.get('grandparent_rating_key'):
-                            grandparent_keys.add(str(item['grandparent_rating_key']))
-                    
-                    if len(page_items) < params['length'] or start >= total_records:
-                        break
-                    start += len(page_items)
-    
-            return len(grandparent_keys)
+            for user_id in self._get_tautulli_user_ids():
+                for item in self.tautulli_history.history(user_id):
+                    if item.get('grandparent_rating_key'):
+                        watched_keys[str(item['grandparent_rating_key'])] = 1
         else:
             # For managed users
             try:
-                total_watched = set()
-                shows_section = self.plex.library.section(self.library_title)
-                account = MyPlexAccount(token=self.config['plex']['token'])
+                account = self._get_account()
                 
                 # Determine which users to process
                 if self.single_user:
@@ -683,32 +1955,27 @@ class PlexTVRecommender:
                             user_plex = self.plex.switchUser(user)
                         
                         watched_shows = user_plex.library.section(self.library_title).search(unwatched=False)
-                        total_watched.update(show.ratingKey for show in watched_shows)
+                        for show in watched_shows:
+                            key = str(show.ratingKey)
+                            watched_keys[key] = watched_keys.get(key, 0) + 1
                         
                     except Exception as e:
                         print(f"{YELLOW}Error getting watch count for user {username}: {e}{RESET}")
                         continue
-                        
-                return len(total_watched)
                 
             except Exception as e:
                 print(f"{YELLOW}Error getting watch count: {e}{RESET}")
-                return 0
+                return {}
+        
+        self._watched_show_keys = watched_keys
+        return watched_keys
 
     def _get_tautulli_user_ids(self):
         """Resolve configured Tautulli usernames to their user IDs"""
         user_ids = []
         try:
             # Get all Tautulli users
-            users_response = requests.get(
-                f"{self.config['tautulli']['url']}/api/v2",
-                params={
-                    'apikey': self.config['tautulli']['api_key'],
-                    'cmd': 'get_users'
-                }
-            )
-            users_response.raise_for_status()
-            tautulli_users = users_response.json()['response']['data']
+            tautulli_users = self.tautulli_history.users()
     
             # Determine which users to process based on single_user mode
             users_to_match = [self.single_user] if self.single_user else self.users['tautulli_users']
@@ -734,7 +2001,6 @@ class PlexTVRecommender:
         if not self.single_user and hasattr(self, 'watched_data_counters') and self.watched_data_counters:
             return self.watched_data_counters
     
-        shows_section = self.plex.library.section(self.library_title)
         counters = {
             'genres': Counter(),
             'studio': Counter(),
@@ -745,6 +2011,7 @@ class PlexTVRecommender:
         }
         watched_show_ids = set()
         not_found_count = 0
+        self.watched_ledger = {}
     
         print(f"{YELLOW}Resolving Tautulli user IDs...{RESET}")
         user_ids = self._get_tautulli_user_ids()
@@ -752,54 +2019,9 @@ class PlexTVRecommender:
             print(f"{RED}No valid Tautulli users found!{RESET}")
             return counters
     
-        # Fetch history for each user with proper pagination
         history_items = []
         for user_id in user_ids:
-            print(f"\n{GREEN}Fetching history for user ID: {user_id}{RESET}")
-            start = 0
-            total_records = None
-    
-            while True:
-                params = {
-                    'apikey': self.config['tautulli']['api_key'],
-                    'cmd': 'get_history',
-                    'media_type': 'episode',
-                    'user_id': user_id,
-                    'length': 1000,  # Max per Tautulli API
-                    'start': start
-                }
-    
-                try:
-                    response = requests.get(
-                        f"{self.config['tautulli']['url']}/api/v2",
-                        params=params
-                    )
-                    response.raise_for_status()
-                    response_data = response.json()
-                    history_data = response_data['response'].get('data', {})
-    
-                    # Handle different response formats
-                    if isinstance(history_data, dict):
-                        page_items = history_data.get('data', [])
-                        total_records = history_data.get('recordsFiltered', 0)
-                    else:  # Legacy format
-                        page_items = history_data
-                        total_records = len(page_items)
-    
-                    history_items.extend(page_items)
-                    print(f"Fetched {len(page_items)} episodes (Total: {len(history_items)})")
-    
-                    # Exit conditions
-                    if not page_items or len(page_items) == 0:
-                        break
-                    if start + len(page_items) >= total_records:
-                        break
-    
-                    start += len(page_items)  # Proper pagination increment
-    
-                except Exception as e:
-                    print(f"{RED}Error fetching history page: {e}{RESET}")
-                    break
+            history_items.extend(self.tautulli_history.history(user_id))
     
         # Process history items
         for item in history_items:
@@ -820,7 +2042,7 @@ class PlexTVRecommender:
             
             show_info = self.show_cache.cache['shows'].get(str(show_id))
             if show_info:
-                self._process_show_counters_from_cache(show_info, counters)
+                self._process_show_counters_from_cache(show_info, counters, str(show_id))
                 
                 # Explicitly add TMDB ID to the set if available
                 if tmdb_id := show_info.get('tmdb_id'):
@@ -855,8 +2077,9 @@ class PlexTVRecommender:
             'tmdb_keywords': Counter(),
             'tmdb_ids': set()  # Initialize as a set for unique IDs
         }
+        self.watched_ledger = {}
         
-        account = MyPlexAccount(token=self.config['plex']['token'])
+        account = self._get_account()
         admin_user = self.users['admin_user']
         
         # Determine which users to process
@@ -887,7 +2110,7 @@ class PlexTVRecommender:
                     
                     show_info = self.show_cache.cache['shows'].get(str(show.ratingKey))
                     if show_info:
-                        self._process_show_counters_from_cache(show_info, counters)
+                        self._process_show_counters_from_cache(show_info, counters, str(show.ratingKey))
                         
                         # Explicitly add TMDB ID to the set if available
                         if tmdb_id := show_info.get('tmdb_id'):
@@ -910,8 +2133,8 @@ class PlexTVRecommender:
             if self.debug:
                 print(f"DEBUG: Saving cache with {len(self.plex_tmdb_cache)} TMDB IDs and {len(self.tmdb_keywords_cache)} keyword sets")
             
-            # Create a copy of the watched data to modify for serialization
-            watched_data_for_cache = copy.deepcopy(self.watched_data_counters)
+            # Shallow copy: only the tmdb_ids set is replaced for serialization
+            watched_data_for_cache = dict(self.watched_data_counters)
             
             # Convert any set objects to lists for JSON serialization
             if 'tmdb_ids' in watched_data_for_cache and isinstance(watched_data_for_cache['tmdb_ids'], set):
@@ -920,14 +2143,21 @@ class PlexTVRecommender:
             cache_data = {
                 'watched_count': self.cached_watched_count,
                 'watched_data_counters': watched_data_for_cache,
+                'watched_ledger': self.watched_ledger,
                 'plex_tmdb_cache': {str(k): v for k, v in self.plex_tmdb_cache.items()},
                 'tmdb_keywords_cache': {str(k): v for k, v in self.tmdb_keywords_cache.items()},
                 'watched_show_ids': list(self.watched_show_ids),
                 'last_updated': datetime.now().isoformat()
             }
+            if self.tautulli_history:
+                cache_data['tautulli_history'] = self.tautulli_history.export_state()
             
-            with open(self.watched_cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, indent=4, ensure_ascii=False)
+            self.state_store.save_watched(self.watched_ctx, cache_data)
+            if self.tautulli_history:
+                self.tautulli_history.dirty = False
+            self.pending_tmdb_ids.clear()
+            self.pending_tmdb_keywords.clear()
+            self.watched_cache_flushed_at = time.time()
                 
             if self.debug:
                 print(f"DEBUG: Cache saved successfully")
@@ -935,54 +2165,140 @@ class PlexTVRecommender:
         except Exception as e:
             print(f"{YELLOW}Error saving watched cache: {e}{RESET}")
 
-    def _save_trakt_sync_cache(self):
+    def _schedule_watched_cache_flush(self):
+        """Write-behind for TMDB lookups: flush once enough entries are pending or the oldest is too old"""
+        pending = len(self.pending_tmdb_ids) + len(self.pending_tmdb_keywords)
+        if (pending >= WATCHED_CACHE_FLUSH_COUNT or
+                time.time() - self.watched_cache_flushed_at >= WATCHED_CACHE_FLUSH_SECONDS):
+            self.flush_watched_cache()
+
+    def flush_watched_cache(self):
+        """Persist pending TMDB IDs and keywords, as single rows where the store allows it"""
+        if not self.pending_tmdb_ids and not self.pending_tmdb_keywords:
+            return
         try:
-            with open(self.trakt_sync_cache_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'synced_show_ids': list(self.synced_show_ids),
-                    'last_sync': datetime.now().isoformat()
-                }, f, indent=4)
+            ids = [(key, self.plex_tmdb_cache[key]) for key in self.pending_tmdb_ids]
+            keywords = [(key, self.tmdb_keywords_cache[key]) for key in self.pending_tmdb_keywords]
+            if self.state_store.put_tmdb_ids(ids) and self.state_store.put_tmdb_keywords(keywords):
+                self.pending_tmdb_ids.clear()
+                self.pending_tmdb_keywords.clear()
+                self.watched_cache_flushed_at = time.time()
+                return
         except Exception as e:
-            print(f"{YELLOW}Error saving Trakt sync cache: {e}{RESET}")
+            print(f"{YELLOW}Error saving TMDB lookups: {e}{RESET}")
+        self._save_watched_cache()
+
+    def _open_state_store(self):
+        if self.cache_backend == 'sqlite':
+            try:
+                return SQLiteStateStore(self.cache_dir)
+            except sqlite3.Error as e:
+                print(f"{YELLOW}Could not open SQLite cache ({e}). Using JSON instead.{RESET}")
+        return JSONStateStore(self.cache_dir)
 
     def _save_cache(self):
         self._save_watched_cache()
 
-    def _process_show_counters_from_cache(self, show_info: Dict, counters: Dict) -> None:
-        try:
-            rating = float(show_info.get('user_rating', 0))
-            if not rating:
-                rating = float(show_info.get('audience_rating', 5.0))
-            rating = max(0, min(10, int(round(rating))))
-            multiplier = RATING_MULTIPLIERS.get(rating, 1.0)
-    
-            # Process all counters using cached data
-            for genre in show_info.get('genres', []):
-                counters['genres'][genre] += multiplier
+    def _show_contribution(self, show_info: Dict) -> Dict:
+        """What one watched show adds to each profile counter"""
+        rating = float(show_info.get('user_rating', 0))
+        if not rating:
+            rating = float(show_info.get('audience_rating', 5.0))
+        rating = max(0, min(10, int(round(rating))))
+        multiplier = RATING_MULTIPLIERS.get(rating, 1.0)
+        contribution = {counter: defaultdict(float) for counter in PROFILE_COUNTERS}
+
+        for genre in show_info.get('genres', []):
+            contribution['genres'][genre] += multiplier
+        
+        if studio := show_info.get('studio'):
+            contribution['studio'][studio.lower()] += multiplier
             
-            if studio := show_info.get('studio'):
-                counters['studio'][studio.lower()] += multiplier
-                
-            for actor in show_info.get('cast', [])[:3]:
-                counters['actors'][actor] += multiplier
-                
-            if language := show_info.get('language'):
-                counters['languages'][language.lower()] += multiplier
-                
-            # Store TMDB data in caches if available
-            if tmdb_id := show_info.get('tmdb_id'):
-                # Using the show_id from the cache key instead of ratingKey
-                show_id = next((k for k, v in self.show_cache.cache['shows'].items() 
-                              if v.get('title') == show_info['title'] and 
-                              v.get('year') == show_info.get('year')), None)
-                if show_id:
-                    self.plex_tmdb_cache[str(show_id)] = tmdb_id
-                    if keywords := show_info.get('tmdb_keywords', []):
-                        self.tmdb_keywords_cache[str(tmdb_id)] = keywords
-                        counters['tmdb_keywords'].update({k: multiplier for k in keywords})
-    
+        for actor in show_info.get('cast', [])[:3]:
+            contribution['actors'][actor] += multiplier
+            
+        if language := show_info.get('language'):
+            contribution['languages'][language.lower()] += multiplier
+            
+        # Store TMDB data in caches if available
+        if tmdb_id := show_info.get('tmdb_id'):
+            # Using the show_id from the cache key instead of ratingKey
+            show_id = self.show_cache.get_rating_key(show_info['title'], show_info.get('year'))
+            if show_id:
+                self.plex_tmdb_cache[str(show_id)] = tmdb_id
+                if keywords := show_info.get('tmdb_keywords', []):
+                    self.tmdb_keywords_cache[str(tmdb_id)] = keywords
+                    for keyword in set(keywords):
+                        contribution['tmdb_keywords'][keyword] = multiplier
+        
+        return {counter: dict(values) for counter, values in contribution.items()}
+
+    @staticmethod
+    def _apply_contribution(counters: Dict, contribution: Dict, sign: int = 1):
+        for counter in PROFILE_COUNTERS:
+            target = counters.setdefault(counter, Counter())
+            for feature, value in contribution.get(counter, {}).items():
+                total = target.get(feature, 0) + sign * value
+                if sign < 0 and abs(total) < 1e-9:
+                    target.pop(feature, None)
+                else:
+                    target[feature] = total
+
+    def _process_show_counters_from_cache(self, show_info: Dict, counters: Dict, show_id: Optional[str] = None) -> None:
+        """Add a watched show to the counters, recording it in the ledger when show_id is given"""
+        try:
+            contribution = self._show_contribution(show_info)
+            self._apply_contribution(counters, contribution)
+            if show_id is not None:
+                entry = self.watched_ledger.get(show_id)
+                if entry:
+                    entry['times'] += 1
+                else:
+                    self.watched_ledger[show_id] = {
+                        'times': 1,
+                        'tmdb_id': show_info.get('tmdb_id'),
+                        'updated_at': show_info.get('updated_at'),
+                        'contribution': contribution
+                    }
         except Exception as e:
             print(f"{YELLOW}Error processing counters for {show_info.get('title')}: {e}{RESET}")
+
+    def _update_watched_counters(self, watched_keys: Dict[str, int]) -> Dict:
+        """Apply only the shows added to or removed from the watch history as deltas.
+        Each ledger entry records exactly what a show contributed, so removals reverse it."""
+        counters = self.watched_data_counters
+        for counter in PROFILE_COUNTERS:
+            counters[counter] = Counter(counters.get(counter, {}))
+        ledger = self.watched_ledger
+        shows = self.show_cache.cache['shows']
+        added = removed = 0
+        
+        # Shows no longer watched, watched by a different number of users, or refreshed
+        # in the show cache since they were counted are reversed and re-added below
+        for show_id in list(ledger):
+            show_info = shows.get(show_id)
+            if (watched_keys.get(show_id, 0) != ledger[show_id]['times'] or not show_info
+                    or show_info.get('updated_at') != ledger[show_id].get('updated_at')):
+                entry = ledger.pop(show_id)
+                for _ in range(entry['times']):
+                    self._apply_contribution(counters, entry['contribution'], sign=-1)
+                removed += 1
+        
+        for show_id, times in watched_keys.items():
+            if show_id in ledger:
+                continue
+            show_info = shows.get(show_id)
+            if not show_info:
+                continue
+            for _ in range(times):
+                self._process_show_counters_from_cache(show_info, counters, show_id)
+            added += 1
+        
+        counters['tmdb_ids'] = {entry['tmdb_id'] for entry in ledger.values() if entry.get('tmdb_id')}
+        self.watched_show_ids = {int(show_id) for show_id in watched_keys if str(show_id).isdigit()}
+        print(f"Updated watch profile incrementally: {added} shows added, {removed} removed")
+        return counters
+
     # ------------------------------------------------------------------------
     # PATH HANDLING
     # ------------------------------------------------------------------------
@@ -1015,53 +2331,28 @@ class PlexTVRecommender:
     # ------------------------------------------------------------------------
     # LIBRARY UTILITIES
     # ------------------------------------------------------------------------
-    def _get_library_shows_set(self) -> Set[tuple]:
-        try:
-            shows = self.plex.library.section(self.library_title)
-            library_shows = set()
-            for show in shows.all():
-                # Handle both normal titles and titles with embedded years
-                title = show.title.lower()
-                year = show.year
-                
-                # Add normal version
-                library_shows.add((title, year))
-                
-                # Check for and strip embedded year pattern
-                year_match = re.search(r'\s*\((\d{4})\)$', title)
-                if year_match:
-                    clean_title = title.replace(year_match.group(0), '').strip()
-                    embedded_year = int(year_match.group(1))
-                    library_shows.add((clean_title, embedded_year))
-                
-            return library_shows
-        except Exception as e:
-            print(f"{RED}Error getting library shows: {e}{RESET}")
-            return set()
+    def _get_library_shows_set(self) -> Dict[str, Set[Optional[int]]]:
+        return self.library_snapshot.title_index
 
-    def _is_show_in_library(self, title: str, year: Optional[int]) -> bool:
+    def _is_show_in_library(self, title: str, year: Optional[int], ids: Optional[Dict] = None) -> bool:
+        # An external ID match is definitive
+        for source, value in (ids or {}).items():
+            if value and str(value) in self.library_ids.get(source, ()):
+                return True
+        
         if not title:
             return False
-            
-        title_lower = title.lower()
-        
-        # Check for year in title and strip it if found
-        year_match = re.search(r'\s*\((\d{4})\)$', title_lower)
-        if year_match:
-            clean_title = title_lower.replace(year_match.group(0), '').strip()
-            embedded_year = int(year_match.group(1))
-            if (clean_title, embedded_year) in self.library_shows:
-                return True
         
-        # Check both with and without year
-        if (title_lower, year) in self.library_shows:
+        clean_title, embedded_year = normalize_title(title)
+        library_years = self.library_shows.get(clean_title)
+        if library_years is None:
+            return False
+        
+        # Same title: only a known, clearly different year marks it as another show (remakes, reboots)
+        year = embedded_year or year
+        if not year or None in library_years:
             return True
-            
-        # Check title-only matches
-        return any(lib_title == title_lower or 
-                  lib_title == f"{title_lower} ({year})" or
-                  lib_title.replace(f" ({year})", "") == title_lower 
-                  for lib_title, lib_year in self.library_shows)
+        return any(abs(year - library_year) <= 1 for library_year in library_years)
 
     def _process_show_counters(self, show, counters):
         show_details = self.get_show_details(show)
@@ -1097,48 +2388,31 @@ class PlexTVRecommender:
         try:
             watched_episodes = [ep for ep in show.episodes() if ep.isWatched]
             if watched_episodes:
+                self.episode_index.ensure_show(show)
+                tvdb_ids = self.episode_index.resolve(ep.ratingKey for ep in watched_episodes)
                 
                 for episode in watched_episodes:
-                    episode.reload()
+                    episode_tvdb_id = tvdb_ids.get(str(episode.ratingKey))
+                    if not episode_tvdb_id or not getattr(episode, 'lastViewedAt', None):
+                        continue
                     
-                    # Get watched date and TVDB ID
-                    if hasattr(episode, 'lastViewedAt') and hasattr(episode, 'guids'):
-                        # Handle lastViewedAt whether it's a timestamp or datetime
-                        if isinstance(episode.lastViewedAt, datetime):
-                            watched_at = episode.lastViewedAt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-                        else:
-                            watched_at = datetime.fromtimestamp(int(episode.lastViewedAt)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
-                        
-                        for guid in episode.guids:
-                            if 'tvdb://' in guid.id:
-                                try:
-                                    episode_tvdb_id = int(guid.id.split('tvdb://')[1].split('?')[0])
-                                    if 'tvdb_ids' not in counters:
-                                        counters['tvdb_ids'] = set()
-                                    if 'watch_dates' not in counters:
-                                        counters['watch_dates'] = {}
-                                    counters['tvdb_ids'].add(episode_tvdb_id)
-                                    counters['watch_dates'][episode_tvdb_id] = watched_at
-                                    break
-                                except (ValueError, IndexError) as e:
-                                    print(f"DEBUG: Error parsing TVDB ID for episode of {show.title}: {e}")
-                                    continue
+                    # Handle lastViewedAt whether it's a timestamp or datetime
+                    if isinstance(episode.lastViewedAt, datetime):
+                        watched_at = episode.lastViewedAt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+                    else:
+                        watched_at = datetime.fromtimestamp(int(episode.lastViewedAt)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+                    
+                    if 'tvdb_ids' not in counters:
+                        counters['tvdb_ids'] = set()
+                    if 'watch_dates' not in counters:
+                        counters['watch_dates'] = {}
+                    counters['tvdb_ids'].add(episode_tvdb_id)
+                    counters['watch_dates'][episode_tvdb_id] = watched_at
         except Exception as e:
             print(f"{YELLOW}Error getting episode TVDB IDs for {show.title}: {e}{RESET}")
 
     def _get_library_imdb_ids(self) -> Set[str]:
-        imdb_ids = set()
-        try:
-            shows = self.plex.library.section(self.library_title).all()
-            for show in shows:
-                if hasattr(show, 'guids'):
-                    for guid in show.guids:
-                        if guid.id.startswith('imdb://'):
-                            imdb_ids.add(guid.id.replace('imdb://', ''))
-                            break
-        except Exception as e:
-            print(f"{YELLOW}Error retrieving IMDb IDs from library: {e}{RESET}")
-        return imdb_ids
+        return self.library_snapshot.imdb_ids
 
     def get_show_details(self, show) -> Dict:
         try:
@@ -1219,11 +2493,8 @@ class PlexTVRecommender:
             return None
     
         try:
-            url = f"https://api.themoviedb.org/3/find/{imdb_id}"
-            params = {'api_key': self.tmdb_api_key, 'external_source': 'imdb_id'}
-            resp = requests.get(url, params=params)
-            resp.raise_for_status()
-            return resp.json().get('tv_results', [{}])[0].get('id')
+            data = self.tmdb.get_json(f"/find/{imdb_id}", {'external_source': 'imdb_id'})
+            return data.get('tv_results', [{}])[0].get('id')
         except Exception as e:
             print(f"{YELLOW}IMDb fallback failed: {e}{RESET}")
             return None
@@ -1254,21 +2525,13 @@ class PlexTVRecommender:
         if not tmdb_id and self.tmdb_api_key:
             try:
                 params = {
-                    'api_key': self.tmdb_api_key,
                     'query': show_title,
                     'include_adult': False
                 }
                 if show_year:
                     params['first_air_date_year'] = show_year
     
-                resp = requests.get(
-                    "https://api.themoviedb.org/3/search/tv",
-                    params=params,
-                    timeout=10
-                )
-                resp.raise_for_status()
-                
-                results = resp.json().get('results', [])
+                results = self.tmdb.get_json("/search/tv", params, timeout=10).get('results', [])
                 if results:
                     exact_match = next(
                         (r for r in results 
@@ -1292,7 +2555,8 @@ class PlexTVRecommender:
             if self.debug:
                 print(f"DEBUG: Adding TMDB ID {tmdb_id} to cache for {plex_show.title}")
             self.plex_tmdb_cache[str(plex_show.ratingKey)] = tmdb_id
-            self._save_watched_cache()
+            self.pending_tmdb_ids.add(str(plex_show.ratingKey))
+            self._schedule_watched_cache_flush()
         return tmdb_id
 
     def _get_plex_show_imdb_id(self, plex_show) -> Optional[str]:
@@ -1306,14 +2570,9 @@ class PlexTVRecommender:
         if not tmdb_id:
             return None
         try:
-            url = f"https://api.themoviedb.org/3/tv/{tmdb_id}"
-            params = {'api_key': self.tmdb_api_key}
-            resp = requests.get(url, params=params)
-            if resp.status_code == 200:
-                data = resp.json()
-                return data.get('external_ids', {}).get('imdb_id')
-            else:
-                print(f"{YELLOW}Failed to fetch IMDb ID from TMDB for show '{plex_show.title}'. Status Code: {resp.status_code}{RESET}")
+            return self.tmdb.get_json(f"/tv/{tmdb_id}/external_ids").get('imdb_id')
+        except requests.exceptions.HTTPError as e:
+            print(f"{YELLOW}Failed to fetch IMDb ID from TMDB for show '{plex_show.title}'. Status Code: {e.response.status_code}{RESET}")
         except Exception as e:
             print(f"{YELLOW}Error fetching IMDb ID for TMDB ID {tmdb_id}: {e}{RESET}")
         return None
@@ -1327,13 +2586,10 @@ class PlexTVRecommender:
 
         kw_set = set()
         try:
-            url = f"https://api.themoviedb.org/3/tv/{tmdb_id}/keywords"
-            params = {'api_key': self.tmdb_api_key}
-            resp = requests.get(url, params=params)
-            if resp.status_code == 200:
-                data = resp.json()
-                keywords = data.get('results', [])
-                kw_set = {k['name'].lower() for k in keywords}
+            keywords = self.tmdb.get_json(f"/tv/{tmdb_id}/keywords").get('results', [])
+            kw_set = {k['name'].lower() for k in keywords}
+        except requests.exceptions.HTTPError:
+            pass
         except Exception as e:
             print(f"{YELLOW}Error fetching TMDB keywords for ID {tmdb_id}: {e}{RESET}")
 
@@ -1341,7 +2597,8 @@ class PlexTVRecommender:
             if self.debug:
                 print(f"DEBUG: Adding {len(kw_set)} keywords to cache for TMDB ID {tmdb_id}")
             self.tmdb_keywords_cache[str(tmdb_id)] = list(kw_set)  # Convert key to string
-            self._save_watched_cache()
+            self.pending_tmdb_keywords.add(str(tmdb_id))
+            self._schedule_watched_cache_flush()
         return kw_set
 
     def _get_show_language(self, show) -> str:
@@ -1410,8 +2667,8 @@ class PlexTVRecommender:
     # ------------------------------------------------------------------------
     def _authenticate_trakt(self):
         try:
-            response = requests.post(
-                'https://api.trakt.tv/oauth/device/code',
+            response = self.trakt.post(
+                '/oauth/device/code',
                 headers={'Content-Type': 'application/json'},
                 json={
                     'client_id': self.config['trakt']['client_id'],
@@ -1435,8 +2692,8 @@ class PlexTVRecommender:
                 
                 while time.time() - start_time < expires_in:
                     time.sleep(poll_interval)
-                    token_response = requests.post(
-                        'https://api.trakt.tv/oauth/device/token',
+                    token_response = self.trakt.post(
+                        '/oauth/device/token',
                         headers={'Content-Type': 'application/json'},
                         json={
                             'code': device_code,
@@ -1452,8 +2709,8 @@ class PlexTVRecommender:
                         self.config['trakt']['token_expiration'] = int(time.time() + token_data['expires_in'])
                         self.trakt_headers['Authorization'] = f"Bearer {token_data['access_token']}"
                         
-                        with open(os.path.join(os.path.dirname(__file__), 'config.yml'), 'w') as f:
-                            yaml.dump(self.config, f)
+                        atomic_write_text(os.path.join(os.path.dirname(__file__), 'config.yml'), yaml.dump(self.config),
+                                          keep_backup=False)
                             
                         print(f"{GREEN}Successfully authenticated with Trakt!{RESET}")
                         return
@@ -1474,8 +2731,8 @@ class PlexTVRecommender:
                 self._authenticate_trakt()
                 return self._verify_trakt_token()
                 
-            refresh_response = requests.post(
-                'https://api.trakt.tv/oauth/token',
+            refresh_response = self.trakt.post(
+                '/oauth/token',
                 headers={'Content-Type': 'application/json'},
                 json={
                     'refresh_token': self.config['trakt']['refresh_token'],
@@ -1493,8 +2750,8 @@ class PlexTVRecommender:
                 self.config['trakt']['token_expiration'] = int(time.time() + token_data['expires_in'])
                 self.trakt_headers['Authorization'] = f"Bearer {token_data['access_token']}"
                 
-                with open(os.path.join(os.path.dirname(__file__), 'config.yml'), 'w') as f:
-                    yaml.dump(self.config, f)
+                atomic_write_text(os.path.join(os.path.dirname(__file__), 'config.yml'), yaml.dump(self.config),
+                                  keep_backup=False)
                     
                 print(f"{GREEN}Successfully refreshed Trakt token{RESET}")
                 return True
@@ -1518,8 +2775,8 @@ class PlexTVRecommender:
                 return self._refresh_trakt_token()
                 
             # Verify token with API call
-            test_response = requests.get(
-                "https://api.trakt.tv/sync/last_activities",
+            test_response = self.trakt.get(
+                "/sync/last_activities",
                 headers=self.trakt_headers
             )
             
@@ -1549,8 +2806,8 @@ class PlexTVRecommender:
         
         try:
             while True:
-                response = requests.get(
-                    "https://api.trakt.tv/sync/history/shows",
+                response = self.trakt.get(
+                    "/sync/history/shows",
                     headers=self.trakt_headers,
                     params={'page': page, 'limit': per_page}
                 )
@@ -1578,8 +2835,8 @@ class PlexTVRecommender:
                     ]
                 }
                 
-                remove_response = requests.post(
-                    "https://api.trakt.tv/sync/history/remove",
+                remove_response = self.trakt.post(
+                    "/sync/history/remove",
                     headers=self.trakt_headers,
                     json=remove_payload
                 )
@@ -1587,14 +2844,13 @@ class PlexTVRecommender:
                 if remove_response.status_code == 200:
                     deleted = remove_response.json().get('deleted', {}).get('shows', 0)                   
                     # Clear the Trakt sync cache
-                    if os.path.exists(self.trakt_sync_cache_path):
-                        try:
-                            os.remove(self.trakt_sync_cache_path)
+                    try:
+                        if self.state_store.clear_synced_episodes():
                             print(f"{GREEN}Cleared Trakt sync cache.{RESET}")
-                        except Exception as e:
-                            print(f"{YELLOW}Error removing Trakt sync cache: {e}{RESET}")
-                    else:
-                        print(f"{GREEN}No Trakt sync cache to clear.{RESET}")
+                        else:
+                            print(f"{GREEN}No Trakt sync cache to clear.{RESET}")
+                    except Exception as e:
+                        print(f"{YELLOW}Error removing Trakt sync cache: {e}{RESET}")
                 else:
                     print(f"{RED}Failed to remove history: {remove_response.status_code}{RESET}")
                     print(f"Response: {remove_response.text}")
@@ -1619,15 +2875,12 @@ class PlexTVRecommender:
         
         # Load existing synced episode IDs from cache
         previously_synced_ids = set()
-        if os.path.exists(self.trakt_sync_cache_path):
-            try:
-                with open(self.trakt_sync_cache_path, 'r') as f:
-                    cache_data = json.load(f)
-                    if 'synced_episode_ids' in cache_data:
-                        previously_synced_ids = set(int(id) for id in cache_data['synced_episode_ids'] if str(id).isdigit())
-                        print(f"Loaded previously synced episode IDs from cache")
-            except Exception as e:
-                print(f"{YELLOW}Error loading Trakt sync cache: {e}{RESET}")
+        try:
+            previously_synced_ids = self.state_store.load_synced_episodes()
+            if previously_synced_ids:
+                print(f"Loaded previously synced episode IDs from cache")
+        except Exception as e:
+            print(f"{YELLOW}Error loading Trakt sync cache: {e}{RESET}")
         
         watched_episodes = []
         
@@ -1639,44 +2892,7 @@ class PlexTVRecommender:
                 # First, get all watch history from Tautulli
                 all_history_items = []
                 for user_id in user_ids:
-                    start = 0
-                    while True:
-                        params = {
-                            'apikey': self.config['tautulli']['api_key'],
-                            'cmd': 'get_history',
-                            'media_type': 'episode',
-                            'user_id': user_id,
-                            'length': 1000,
-                            'start': start
-                        }
-                        
-                        try:
-                            response = requests.get(
-                                f"{self.config['tautulli']['url']}/api/v2", 
-                                params=params,
-                                timeout=30
-                            )
-                            
-                            response.raise_for_status()
-                            data = response.json()['response']['data']
-                            
-                            if isinstance(data, dict):
-                                history_items = data.get('data', [])
-                            else:
-                                history_items = data
-                            
-                            all_history_items.extend(history_items)
-                            
-                            # Check if we should continue to next page
-                            if len(history_items) < 1000:
-                                break
-                                
-                            start += len(history_items)
-                            
-                        except Exception as e:
-                            if self.debug:
-                                print(f"DEBUG: Error fetching Tautulli history: {e}")
-                            break
+                    all_history_items.extend(self.tautulli_history.history(user_id))
                 
                 print(f"Gathering episode data from {len(all_history_items)} history items...")
                 
@@ -1688,31 +2904,13 @@ class PlexTVRecommender:
                         if key not in episode_groups:
                             episode_groups[key] = item
                         
-                # Process each unique episode with progress indicator
-                total_episodes = len(episode_groups)
-                for i, (key, item) in enumerate(episode_groups.items()):
-                    # Show progress every 10 episodes or for the first/last one
-                    if i == 0 or i == total_episodes-1 or (i+1) % 10 == 0:
-                        progress = int((i+1) / total_episodes * 100)
-                        sys.stdout.write(f"\rProcessing episodes: {i+1}/{total_episodes} ({progress}%)")
-                        sys.stdout.flush()
-                        
+                # Resolve every episode's TVDB ID in bulk instead of one fetch per episode
+                tvdb_ids = self.episode_index.resolve(episode_groups.keys())
+                self.episode_index.save()
+                
+                for key, item in episode_groups.items():
                     try:
-                        # Get the actual episode from Plex to ensure correct TVDB ID
-                        episode = self.plex.fetchItem(int(key))
-                        
-                        # Extract TVDB ID directly from the episode's GUIDs
-                        tvdb_id = None
-                        if hasattr(episode, 'guids'):
-                            for guid in episode.guids:
-                                if 'tvdb://' in guid.id:
-                                    try:
-                                        # Extract the actual episode TVDB ID
-                                        tvdb_id = int(guid.id.split('tvdb://')[1].split('?')[0])
-                                        break
-                                    except (ValueError, IndexError):
-                                        continue
-                        
+                        tvdb_id = tvdb_ids.get(str(key))
                         if not tvdb_id:
                             continue
                         
@@ -1734,9 +2932,6 @@ class PlexTVRecommender:
                             print(f"\nDEBUG: Error processing episode {item.get('full_title', 'Unknown')}: {e}")
                         continue
                 
-                # Print newline after progress indicator
-                print("")
-                
             else:
                 # Process each show's episodes with progress
                 print(f"Gathering episode data from {len(self.watched_show_ids)} watched shows...")
@@ -1755,39 +2950,33 @@ class PlexTVRecommender:
                         sys.stdout.write(f"\rProcessing shows: {show_count}/{total_shows} ({progress}%) - Found {episode_count} episodes")
                         sys.stdout.flush()
                         
+                        # TVDB IDs come from the episode index instead of each episode's GUIDs
+                        self.episode_index.ensure_show(show)
+                        tvdb_ids = self.episode_index.resolve(ep.ratingKey for ep in show_episodes)
+                        
                         for episode in show_episodes:
-                            if hasattr(episode, 'guids'):
-                                # Extract TVDB ID directly from the episode's GUIDs
-                                tvdb_id = None
-                                for guid in episode.guids:
-                                    if 'tvdb://' in guid.id:
-                                        try:
-                                            tvdb_id = int(guid.id.split('tvdb://')[1].split('?')[0])
-                                            break
-                                        except (ValueError, IndexError):
-                                            continue
+                            tvdb_id = tvdb_ids.get(str(episode.ratingKey))
+                            if not tvdb_id:
+                                continue
                                 
-                                if not tvdb_id:
-                                    continue
-                                    
-                                watched_at = None
-                                if hasattr(episode, 'lastViewedAt'):
-                                    if isinstance(episode.lastViewedAt, datetime):
-                                        watched_at = episode.lastViewedAt
-                                    else:
-                                        watched_at = datetime.fromtimestamp(int(episode.lastViewedAt))
+                            watched_at = None
+                            if getattr(episode, 'lastViewedAt', None):
+                                if isinstance(episode.lastViewedAt, datetime):
+                                    watched_at = episode.lastViewedAt
+                                else:
+                                    watched_at = datetime.fromtimestamp(int(episode.lastViewedAt))
+                            
+                            if not watched_at:
+                                continue
                                 
-                                if not watched_at:
-                                    continue
-                                    
-                                watched_episodes.append({
-                                    'tvdb_id': tvdb_id,
-                                    'show_title': show.title,
-                                    'season': episode.seasonNumber,
-                                    'episode': episode.index,
-                                    'watched_at': watched_at.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-                                })
-                                episode_count += 1
+                            watched_episodes.append({
+                                'tvdb_id': tvdb_id,
+                                'show_title': show.title,
+                                'season': episode.seasonNumber,
+                                'episode': episode.index,
+                                'watched_at': watched_at.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+                            })
+                            episode_count += 1
                                 
                     except Exception as e:
                         if self.debug:
@@ -1796,6 +2985,7 @@ class PlexTVRecommender:
                 
                 # Print newline after progress indicator
                 print("")
+                self.episode_index.save()
         
             if not watched_episodes:
                 print(f"{YELLOW}No episodes found to sync to Trakt{RESET}")
@@ -1836,8 +3026,8 @@ class PlexTVRecommender:
                 }
         
                 try:
-                    response = requests.post(
-                        "https://api.trakt.tv/sync/history",
+                    response = self.trakt.post(
+                        "/sync/history",
                         headers=self.trakt_headers,
                         json=payload,
                         timeout=60
@@ -1865,12 +3055,7 @@ class PlexTVRecommender:
             # Update and save Trakt sync cache - combine previously synced with newly synced
             if newly_synced:
                 try:
-                    all_synced = previously_synced_ids.union(newly_synced)
-                    with open(self.trakt_sync_cache_path, 'w') as f:
-                        json.dump({
-                            'synced_episode_ids': list(all_synced),
-                            'last_sync': datetime.now().isoformat()
-                        }, f, indent=4)
+                    self.state_store.add_synced_episodes(newly_synced)
                 except Exception as e:
                     print(f"{RED}Error saving Trakt sync cache: {e}{RESET}")
         except Exception as outer_e:
@@ -1881,6 +3066,14 @@ class PlexTVRecommender:
     # ------------------------------------------------------------------------
     # CALCULATE SCORES
     # ------------------------------------------------------------------------
+    def _get_user_profile(self) -> 'UserProfile':
+        """Return the compiled profile for the current watched data, building it once"""
+        profile = getattr(self, 'user_profile', None)
+        if profile is None or profile.source is not self.watched_data:
+            profile = UserProfile(self.watched_data, self.normalize_counters)
+            self.user_profile = profile
+        return profile
+
     def _calculate_similarity_from_cache(self, show_info: Dict) -> Tuple[float, Dict]:
         """Calculate similarity score using cached show data and return score with breakdown"""
         try:
@@ -1901,44 +3094,20 @@ class PlexTVRecommender:
             }
             
             weights = self.weights
-            user_prefs = {
-                'genres': Counter(self.watched_data.get('genres', {})),
-                'studio': Counter(self.watched_data.get('studio', {})),
-                'actors': Counter(self.watched_data.get('actors', {})),
-                'languages': Counter(self.watched_data.get('languages', {})),
-                'keywords': Counter(self.watched_data.get('tmdb_keywords', {}))
-            }
-            
-            max_counts = {
-                'genres': max(user_prefs['genres'].values()) if user_prefs['genres'] else 1,
-                'studio': max(user_prefs['studio'].values()) if user_prefs['studio'] else 1,
-                'actors': max(user_prefs['actors'].values()) if user_prefs['actors'] else 1,
-                'languages': max(user_prefs['languages'].values()) if user_prefs['languages'] else 1,
-                'keywords': max(user_prefs['keywords'].values()) if user_prefs['keywords'] else 1
-            }
+            profile = self._get_user_profile()
     
             # Genre Score
-            show_genres = set(show_info.get('genres', []))
+            show_genres = set(show_info.get('genres') or [])
             if show_genres:
                 genre_scores = []
+                genre_prefs = profile.weights['genres']
                 for genre in show_genres:
-                    genre_count = user_prefs['genres'].get(genre, 0)
-                    if genre_count > 0:
-                        if self.normalize_counters:
-                            # Enhanced normalization with square root to strengthen effect
-                            # This will boost lower values more significantly
-                            normalized_score = math.sqrt(genre_count / max_counts['genres'])
-                            genre_scores.append(normalized_score)
-                            score_breakdown['details']['genres'].append(
-                                f"{genre} (count: {genre_count}, norm: {round(normalized_score, 2)})"
-                            )
-                        else:
-                            # When not normalizing, use raw relative proportion
-                            normalized_score = min(genre_count / max_counts['genres'], 1.0)
-                            genre_scores.append(normalized_score)
-                            score_breakdown['details']['genres'].append(
-                                f"{genre} (count: {genre_count}, norm: {round(normalized_score, 2)})"
-                            )
+                    if genre in genre_prefs:
+                        genre_count, normalized_score = genre_prefs[genre]
+                        genre_scores.append(normalized_score)
+                        score_breakdown['details']['genres'].append(
+                            f"{genre} (count: {genre_count}, norm: {round(normalized_score, 2)})"
+                        )
                 if genre_scores:
                     genre_final = (sum(genre_scores) / len(genre_scores)) * weights.get('genre_weight', 0.25)
                     score += genre_final
@@ -1946,36 +3115,27 @@ class PlexTVRecommender:
     
             # Studio Score
             if show_info.get('studio') and show_info['studio'] != 'N/A':
-                studio_count = user_prefs['studio'].get(show_info['studio'].lower(), 0)
-                if studio_count > 0:
-                    if self.normalize_counters:
-                        normalized_score = math.sqrt(studio_count / max_counts['studio'])
-                    else:
-                        normalized_score = min(studio_count / max_counts['studio'], 1.0)
-                    
+                studio_pref = profile.weights['studio'].get(show_info['studio'].lower())
+                if studio_pref:
+                    studio_count, normalized_score = studio_pref
                     studio_final = normalized_score * weights.get('studio_weight', 0.20)
                     score += studio_final
                     score_breakdown['studio_score'] = round(studio_final, 3)
                     score_breakdown['details']['studio'] = f"{show_info['studio']} (count: {studio_count}, norm: {round(normalized_score, 2)})"
     
             # Actor Score
-            show_cast = show_info.get('cast', [])
+            show_cast = show_info.get('cast') or []
             if show_cast:
                 actor_scores = []
-                matched_actors = 0
+                actor_prefs = profile.weights['actors']
                 for actor in show_cast:
-                    actor_count = user_prefs['actors'].get(actor, 0)
-                    if actor_count > 0:
-                        matched_actors += 1
-                        if self.normalize_counters:
-                            normalized_score = math.sqrt(actor_count / max_counts['actors'])
-                        else:
-                            normalized_score = min(actor_count / max_counts['actors'], 1.0)
-                            
+                    if actor in actor_prefs:
+                        actor_count, normalized_score = actor_prefs[actor]
                         actor_scores.append(normalized_score)
                         score_breakdown['details']['actors'].append(
                             f"{actor} (count: {actor_count}, norm: {round(normalized_score, 2)})"
                         )
+                matched_actors = len(actor_scores)
                 if matched_actors > 0:
                     actor_score = sum(actor_scores) / matched_actors
                     if matched_actors > 3:
@@ -1985,18 +3145,12 @@ class PlexTVRecommender:
                     score_breakdown['actor_score'] = round(actor_final, 3)
     
             # Language Score
-            show_language = show_info.get('language', 'N/A')
+            # Missing and None languages both count as unknown, as in ShowFeatureMatrix
+            show_language = show_info.get('language') or 'N/A'
             if show_language != 'N/A':
-                show_lang_lower = show_language.lower()
-                            
-                lang_count = user_prefs['languages'].get(show_lang_lower, 0)
-                
-                if lang_count > 0:
-                    if self.normalize_counters:
-                        normalized_score = math.sqrt(lang_count / max_counts['languages'])
-                    else:
-                        normalized_score = min(lang_count / max_counts['languages'], 1.0)
-                    
+                lang_pref = profile.weights['languages'].get(show_language.lower())
+                if lang_pref:
+                    lang_count, normalized_score = lang_pref
                     lang_final = normalized_score * weights.get('language_weight', 0.10)
                     score += lang_final
                     score_breakdown['language_score'] = round(lang_final, 3)
@@ -2005,14 +3159,10 @@ class PlexTVRecommender:
             # TMDB Keywords Score
             if self.use_tmdb_keywords and show_info.get('tmdb_keywords'):
                 keyword_scores = []
+                keyword_prefs = profile.weights['keywords']
                 for kw in show_info['tmdb_keywords']:
-                    count = user_prefs['keywords'].get(kw, 0)
-                    if count > 0:
-                        if self.normalize_counters:
-                            normalized_score = math.sqrt(count / max_counts['keywords'])
-                        else:
-                            normalized_score = min(count / max_counts['keywords'], 1.0)
-                            
+                    if kw in keyword_prefs:
+                        count, normalized_score = keyword_prefs[kw]
                         keyword_scores.append(normalized_score)
                         score_breakdown['details']['keywords'].append(
                             f"{kw} (count: {count}, norm: {round(normalized_score, 2)})"
@@ -2031,6 +3181,70 @@ class PlexTVRecommender:
             print(f"{YELLOW}Error calculating similarity score for {show_info.get('title', 'Unknown')}: {e}{RESET}")
             return 0.0, score_breakdown
 
+    def _get_feature_matrix(self) -> ShowFeatureMatrix:
+        """Return the sparse feature matrix for the show cache, rebuilt whenever the cache changes"""
+        matrix = getattr(self, 'feature_matrix', None)
+        if matrix is None or matrix.version != self.show_cache.version:
+            matrix = ShowFeatureMatrix(self.show_cache.cache['shows'], self.show_cache.version)
+            self.feature_matrix = matrix
+        return matrix
+
+    def _score_shows_vectorized(self, shows: List[Dict], show_ids: List[str]) -> List[Dict]:
+        """Score all candidates at once and return them sorted by similarity score"""
+        matrix = self._get_feature_matrix()
+        all_scores = matrix.score(self._get_user_profile(), self.weights, self.use_tmdb_keywords)
+        scores = all_scores[[matrix.row_of[show_id] for show_id in show_ids]]
+        if self.debug:
+            self._check_scoring_parity(shows, scores)
+        
+        # Stable sort keeps ties in library order, same as list.sort
+        scored_shows = []
+        for idx in np.argsort(-scores, kind='stable'):
+            show_info = shows[idx]
+            show_info['similarity_score'] = float(scores[idx])
+            scored_shows.append(show_info)
+        return scored_shows
+
+    def _check_scoring_parity(self, shows: List[Dict], scores) -> bool:
+        """Compare vectorized scores with the per-show scorer for every candidate"""
+        mismatches = []
+        for show_info, score in zip(shows, scores):
+            expected, _ = self._calculate_similarity_from_cache(show_info)
+            if not math.isclose(score, expected, rel_tol=1e-9, abs_tol=1e-12):
+                mismatches.append((show_info.get('title'), float(score), expected))
+        if mismatches:
+            print(f"{RED}DEBUG: Vectorized scores differ from per-show scores for {len(mismatches)} "
+                  f"of {len(shows)} shows{RESET}")
+            for title, score, expected in mismatches[:10]:
+                print(f"{RED}DEBUG:   {title}: {score} != {expected}{RESET}")
+        else:
+            print(f"DEBUG: Vectorized scores match per-show scores for all {len(shows)} shows")
+        return not mismatches
+
+    def _score_shows_in_processes(self, shows: List[Dict], top_k: int) -> Optional[List[Dict]]:
+        """Score candidates on scoring_processes worker processes and return the top_k, sorted.
+        Breakdowns are left to _add_score_breakdowns. Returns None if the pool fails,
+        so the caller can score in-process instead."""
+        print(f"Scoring on {self.scoring_processes} processes...")
+        scorer = SimilarityScorer(self._get_user_profile(), self.weights, self.use_tmdb_keywords)
+        try:
+            top = score_shows_in_processes(shows, scorer, self.scoring_processes, top_k)
+        except Exception as e:
+            print(f"{YELLOW}Process-pool scoring failed ({e}). Scoring in a single process.{RESET}")
+            return None
+        
+        scored_shows = []
+        for score, idx in top:
+            show_info = shows[idx]
+            show_info['similarity_score'] = score
+            scored_shows.append(show_info)
+        return scored_shows
+
+    def _add_score_breakdowns(self, shows: List[Dict]):
+        """Build score breakdowns for the selected shows only"""
+        for show_info in shows:
+            _, show_info['score_breakdown'] = self._calculate_similarity_from_cache(show_info)
+
     def _print_similarity_breakdown(self, show_info: Dict, score: float, breakdown: Dict):
         """Print detailed breakdown of similarity score calculation"""
         print(f"\n{CYAN}Similarity Score Breakdown for '{show_info['title']}'{RESET}")
@@ -2062,8 +3276,8 @@ class PlexTVRecommender:
                 print(f"{RED}Failed to verify Trakt token. Skipping recommendations.{RESET}")
                 return []
             # First check if there's any watch history
-            history_response = requests.get(
-                "https://api.trakt.tv/sync/history/shows",
+            history_response = self.trakt.get(
+                "/sync/history/shows",
                 headers=self.trakt_headers,
                 params={'limit': 1}
             )
@@ -2078,13 +3292,13 @@ class PlexTVRecommender:
     
             # If we have history, proceed with getting recommendations
             print(f"Fetching recommendations from Trakt...")
-            url = "https://api.trakt.tv/recommendations/tv"
+            url = "/recommendations/tv"
             collected_recs = []
             page = 1
             per_page = 100  # Trakt's maximum allowed per page
     
             while len(collected_recs) < self.limit_trakt_results:
-                response = requests.get(
+                response = self.trakt.get(
                     url,
                     headers=self.trakt_headers,
                     params={
@@ -2124,7 +3338,7 @@ class PlexTVRecommender:
                         title = show.get('title', '').strip()
                         year = show.get('year', None)
                 
-                        if not title or self._is_show_in_library(title, year):
+                        if not title or self._is_show_in_library(title, year, show.get('ids')):
                             continue
     
                         ratings = {
@@ -2140,44 +3354,16 @@ class PlexTVRecommender:
                             'cast': [],
                             'studio': "N/A",
                             'language': "N/A",
+                            'tmdb_keywords': [],
+                            'tmdb_id': show.get('ids', {}).get('tmdb'),
+                            'tvdb_id': show.get('ids', {}).get('tvdb'),
+                            'trakt_id': show.get('ids', {}).get('trakt'),
                             'imdb_id': show.get('ids', {}).get('imdb')
                         }
     
                         if any(g in self.exclude_genres for g in sd['genres']):
                             continue
     
-                        tmdb_id = show.get('ids', {}).get('tmdb')
-    
-                        if tmdb_id and self.tmdb_api_key:
-                            if self.show_language:
-                                try:
-                                    resp_lang = requests.get(
-                                        f"https://api.themoviedb.org/3/tv/{tmdb_id}",
-                                        params={'api_key': self.tmdb_api_key}
-                                    )
-                                    resp_lang.raise_for_status()
-                                    d = resp_lang.json()
-                                    if 'original_language' in d:
-                                        sd['language'] = get_full_language_name(d['original_language'])
-                                except Exception as e:
-                                    print(f"{YELLOW}Error fetching language for '{title}': {e}{RESET}")
-    
-                            if self.show_cast or self.show_studio:
-                                try:
-                                    resp_credits = requests.get(
-                                        f"https://api.themoviedb.org/3/tv/{tmdb_id}/credits",
-                                        params={'api_key': self.tmdb_api_key}
-                                    )
-                                    resp_credits.raise_for_status()
-                                    c_data = resp_credits.json()
-    
-                                    if self.show_cast and 'cast' in c_data:
-                                        c_sorted = c_data['cast'][:3]
-                                        sd['cast'] = [c['name'] for c in c_sorted]
-    
-                                except Exception as e:
-                                    print(f"{YELLOW}Error fetching credits for '{title}': {e}{RESET}")
-    
                         collected_recs.append(sd)
     
                     if len(shows) < per_page:
@@ -2195,12 +3381,46 @@ class PlexTVRecommender:
             collected_recs.sort(key=lambda x: x.get('ratings', {}).get('audience_rating', 0), reverse=True)
             random.shuffle(collected_recs)
             final_recs = collected_recs[:self.limit_trakt_results]
+            
+            if final_recs and self.tmdb_api_key:
+                self._enrich_trakt_recommendations(final_recs)
+            for sd in final_recs:
+                sd['similarity_score'], sd['score_breakdown'] = self._calculate_similarity_from_cache(sd)
+                if self.debug:
+                    self._print_similarity_breakdown(sd, sd['similarity_score'], sd['score_breakdown'])
             return final_recs
     
         except Exception as e:
             print(f"{RED}Error getting Trakt recommendations: {e}{RESET}")
             return []
 
+    def _enrich_trakt_recommendations(self, recs: List[Dict]):
+        """Fill language, cast, studio and keywords of the selected Trakt shows from TMDB,
+        one request per show with credits and keywords appended"""
+        with_tmdb = [sd for sd in recs if sd.get('tmdb_id')]
+        if not with_tmdb:
+            return
+        print(f"Fetching TMDB details for {len(with_tmdb)} Trakt recommendations...")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            details = list(executor.map(self._fetch_trakt_show_details, with_tmdb))
+        for sd, data in zip(with_tmdb, details):
+            if not data:
+                continue
+            if data.get('original_language'):
+                sd['language'] = get_full_language_name(data['original_language'])
+            sd['cast'] = [c['name'] for c in data.get('credits', {}).get('cast', [])[:3]]
+            companies = data.get('networks') or data.get('production_companies') or []
+            if companies and companies[0].get('name'):
+                sd['studio'] = companies[0]['name']
+            sd['tmdb_keywords'] = [k['name'].lower() for k in data.get('keywords', {}).get('results', [])]
+
+    def _fetch_trakt_show_details(self, sd: Dict) -> Optional[Dict]:
+        try:
+            return self.tmdb.get_json(f"/tv/{sd['tmdb_id']}", {'append_to_response': 'credits,keywords'})
+        except Exception as e:
+            print(f"{YELLOW}Error fetching TMDB details for '{sd['title']}': {e}{RESET}")
+            return None
+
     def get_recommendations(self) -> Dict[str, List[Dict]]:
         if self.cached_watched_count > 0 and not self.watched_show_ids:
             # Force refresh of watched data
@@ -2228,6 +3448,7 @@ class PlexTVRecommender:
         
         # Filter out watched shows and excluded genres
         unwatched_shows = []
+        unwatched_ids = []
         excluded_count = 0
         
         for show_id, show_info in all_shows.items():
@@ -2240,7 +3461,9 @@ class PlexTVRecommender:
                 excluded_count += 1
                 continue
                 
-            unwatched_shows.append(show_info)
+            # Copy so scores stay off the cache entries; the ratingKey lets labels skip a Plex search
+            unwatched_shows.append(dict(show_info, rating_key=show_id))
+            unwatched_ids.append(show_id)
     
         if excluded_count > 0:
             print(f"Excluded {excluded_count} shows based on genre filters")
@@ -2251,31 +3474,46 @@ class PlexTVRecommender:
         else:
             print(f"Calculating similarity scores for {len(unwatched_shows)} shows...")
             
-            # Calculate similarity scores
-            scored_shows = []
-            for i, show_info in enumerate(unwatched_shows, 1):
-                self._show_progress("Processing", i, len(unwatched_shows))
-                try:
-                    similarity_score, breakdown = self._calculate_similarity_from_cache(show_info)
-                    show_info['similarity_score'] = similarity_score
-                    show_info['score_breakdown'] = breakdown
-                    scored_shows.append(show_info)
-                except Exception as e:
-                    print(f"{YELLOW}Error processing {show_info['title']}: {e}{RESET}")
-                    continue
+            if self.randomize_recommendations:
+                # Randomize within the top 10% of shows by similarity score
+                top_count = max(int(len(unwatched_shows) * 0.1), self.limit_plex_results)
+            else:
+                top_count = self.limit_plex_results
             
-            # Sort by similarity score
-            scored_shows.sort(key=lambda x: x['similarity_score'], reverse=True)
+            scored_shows = None
+            if self.vectorized_scoring:
+                scored_shows = self._score_shows_vectorized(unwatched_shows, unwatched_ids)
+            elif self.scoring_processes > 1 and len(unwatched_shows) >= SCORING_PROCESS_MIN_SHOWS:
+                scored_shows = self._score_shows_in_processes(unwatched_shows, top_count)
+            # The fast paths only score; breakdowns are built for the final picks
+            needs_breakdowns = scored_shows is not None
+            if scored_shows is None:
+                # Calculate similarity scores
+                scored_shows = []
+                for i, show_info in enumerate(unwatched_shows, 1):
+                    self._show_progress("Processing", i, len(unwatched_shows))
+                    try:
+                        similarity_score, breakdown = self._calculate_similarity_from_cache(show_info)
+                        show_info['similarity_score'] = similarity_score
+                        show_info['score_breakdown'] = breakdown
+                        scored_shows.append(show_info)
+                    except Exception as e:
+                        print(f"{YELLOW}Error processing {show_info['title']}: {e}{RESET}")
+                        continue
+                
+                # Sort by similarity score
+                scored_shows.sort(key=lambda x: x['similarity_score'], reverse=True)
             
             if self.randomize_recommendations:
-                # Take top 10% of shows by similarity score and randomize
-                top_count = max(int(len(scored_shows) * 0.1), self.limit_plex_results)
                 top_pool = scored_shows[:top_count]
                 plex_recs = random.sample(top_pool, min(self.limit_plex_results, len(top_pool)))
             else:
                 # Take top shows directly by similarity score
                 plex_recs = scored_shows[:self.limit_plex_results]
             
+            if needs_breakdowns:
+                self._add_score_breakdowns(plex_recs)
+            
             # Print detailed breakdowns for final recommendations if debug is enabled
             if self.debug:
                 print(f"\n{GREEN}=== Similarity Score Breakdowns for Recommendations ==={RESET}")
@@ -2347,7 +3585,7 @@ class PlexTVRecommender:
             selected_shows = recommended_shows
     
         try:
-            shows_section = self.plex.library.section(self.library_title)
+            shows_section = self.library_snapshot.section
             label_name = self.config['plex'].get('label_name', 'Recommended')
     
             # Handle username appending for labels
@@ -2369,8 +3607,12 @@ class PlexTVRecommender:
                         user_suffix = '_'.join(sanitized_users)
                         label_name = f"{label_name}_{user_suffix}"
     
-            shows_to_update = []
+            # Fetch all recommended shows in one request by ratingKey; search only for shows without one
+            rating_keys = [int(rec['rating_key']) for rec in selected_shows if rec.get('rating_key')]
+            shows_to_update = self.plex.fetchItems(rating_keys) if rating_keys else []
             for rec in selected_shows:
+                if rec.get('rating_key'):
+                    continue
                 plex_show = next(
                     (s for s in shows_section.search(title=rec['title'])
                      if s.year == rec.get('year')), 
@@ -2386,22 +3628,29 @@ class PlexTVRecommender:
     
             if self.config['plex'].get('remove_previous_recommendations', False):
                 print(f"{YELLOW}Finding shows with existing label: {label_name}{RESET}")
-                labeled_shows = set(shows_section.search(label=label_name))
-                shows_to_unlabel = labeled_shows - set(shows_to_update)
-                for show in shows_to_unlabel:
-                    current_labels = [label.tag for label in show.labels]
-                    if label_name in current_labels:
-                        show.removeLabel(label_name)
+                keep_keys = {show.ratingKey for show in shows_to_update}
+                shows_to_unlabel = [show for show in shows_section.search(label=label_name)
+                                    if show.ratingKey not in keep_keys]
+                if shows_to_unlabel:
+                    shows_section.batchMultiEdits(shows_to_unlabel)
+                    shows_section.removeLabel(label_name)
+                    shows_section.saveMultiEdits()
+                    for show in shows_to_unlabel:
                         print(f"{YELLOW}Removed label from: {show.title}{RESET}")
     
             print(f"{YELLOW}Adding label to recommended shows...{RESET}")
+            shows_to_label = []
             for show in shows_to_update:
-                current_labels = [label.tag for label in show.labels]
-                if label_name not in current_labels:
-                    show.addLabel(label_name)
-                    print(f"{GREEN}Added label to: {show.title}{RESET}")
-                else:
+                if label_name in [label.tag for label in show.labels]:
                     print(f"{YELLOW}Label already exists on: {show.title}{RESET}")
+                else:
+                    shows_to_label.append(show)
+            if shows_to_label:
+                shows_section.batchMultiEdits(shows_to_label)
+                shows_section.addLabel(label_name)
+                shows_section.saveMultiEdits()
+                for show in shows_to_label:
+                    print(f"{GREEN}Added label to: {show.title}{RESET}")
     
             print(f"{GREEN}Successfully updated labels for recommended shows{RESET}")
     
@@ -2456,18 +3705,10 @@ class PlexTVRecommender:
             if missing_fields:
                 raise ValueError(f"Missing required Sonarr config fields: {', '.join(missing_fields)}")
     
-            sonarr_url = self.sonarr_config['url'].rstrip('/')
-            if '/api/' not in sonarr_url:
-                sonarr_url += '/api/v3'
-            
-            headers = {
-                'X-Api-Key': self.sonarr_config['api_key'],
-                'Content-Type': 'application/json'
-            }
-            trakt_headers = self.trakt_headers
+            sonarr = SonarrClient(self.sonarr_config['url'], self.sonarr_config['api_key'])
     
             try:
-                test_response = requests.get(f"{sonarr_url}/system/status", headers=headers)
+                test_response = sonarr.get("/system/status")
                 test_response.raise_for_status()
             except requests.exceptions.RequestException as e:
                 raise ValueError(f"Failed to connect to Sonarr: {str(e)}")
@@ -2497,23 +3738,19 @@ class PlexTVRecommender:
                             tag_name = f"{tag_name}_{user_suffix}"
                 
                 # Get or create the tag in Sonarr
-                tags_response = requests.get(f"{sonarr_url}/tag", headers=headers)
+                tags_response = sonarr.get("/tag")
                 tags_response.raise_for_status()
                 tags = tags_response.json()
                 tag = next((t for t in tags if t['label'].lower() == tag_name.lower()), None)
                 if tag:
                     tag_id = tag['id']
                 else:
-                    tag_response = requests.post(
-                        f"{sonarr_url}/tag",
-                        headers=headers,
-                        json={'label': tag_name}
-                    )
+                    tag_response = sonarr.post("/tag", json={'label': tag_name})
                     tag_response.raise_for_status()
                     tag_id = tag_response.json()['id']
                     print(f"{GREEN}Created new Sonarr tag: {tag_name}{RESET}")
     
-            profiles_response = requests.get(f"{sonarr_url}/qualityprofile", headers=headers)
+            profiles_response = sonarr.get("/qualityprofile")
             profiles_response.raise_for_status()
             quality_profiles = profiles_response.json()
             desired_profile = next(
@@ -2529,217 +3766,349 @@ class PlexTVRecommender:
                 )
             quality_profile_id = desired_profile['id']
     
-            existing_response = requests.get(f"{sonarr_url}/series", headers=headers)
+            existing_response = sonarr.get("/series")
             existing_response.raise_for_status()
-            existing_shows = existing_response.json()
-            existing_tvdb_ids = {s['tvdbId'] for s in existing_shows}
+            existing_by_tvdb = {s['tvdbId']: s for s in existing_response.json()}
     
-            for show in selected_shows:
-                try:
-                    trakt_search_url = f"https://api.trakt.tv/search/show?query={quote(show['title'])}"
-                    if show.get('year'):
-                        trakt_search_url += f"&year={show['year']}"
+            # Resolve every selected show to its TVDB ID before touching Sonarr
+            print(f"Resolving TVDB IDs for {len(selected_shows)} shows...")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                resolved = list(executor.map(self._resolve_sonarr_ids, selected_shows))
     
-                    trakt_response = requests.get(trakt_search_url, headers=trakt_headers)
-                    trakt_response.raise_for_status()
-                    trakt_results = trakt_response.json()
+            settings = {
+                'tag_id': tag_id,
+                'quality_profile_id': quality_profile_id,
+                'monitor_option': monitor_option,
+                'search_missing': search_missing,
+                'season_folder': season_folder,
+                'root_folder': self._map_path(self.sonarr_config['root_folder'].rstrip('/\\'))
+            }
+            jobs = [(show, ids) for show, ids in zip(selected_shows, resolved) if ids]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                search_ids = list(executor.map(
+                    lambda job: self._submit_to_sonarr(sonarr, job[0], *job[1], existing_by_tvdb, settings),
+                    jobs
+                ))
     
-                    if not trakt_results:
-                        print(f"{YELLOW}Show not found on Trakt: {show['title']}{RESET}")
-                        continue
+            search_ids = [series_id for series_id in search_ids if series_id]
+            if search_ids:
+                self._trigger_sonarr_search(sonarr, search_ids)
     
-                    trakt_show = next(
-                        (r for r in trakt_results
-                         if r['show']['title'].lower() == show['title'].lower()
-                         and r['show'].get('year') == show.get('year')),
-                        trakt_results[0]
-                    )
+        except Exception as e:
+            print(f"{RED}Error adding shows to Sonarr: {e}{RESET}")
+            import traceback
+            print(traceback.format_exc())
+
+    def _resolve_sonarr_ids(self, show: Dict) -> Optional[Tuple[Optional[int], int]]:
+        """Return a show's (TMDB ID, TVDB ID), or None.
+        IDs carried on the recommendation are used first; a Trakt title search is the last resort."""
+        tmdb_id = show.get('tmdb_id')
+        tvdb_id = show.get('tvdb_id')
+        if tvdb_id and tvdb_id > 0:
+            return tmdb_id, tvdb_id
+        if not tmdb_id:
+            ids = self._search_trakt_ids(show)
+            if not ids:
+                return None
+            if ids.get('tvdb') and ids['tvdb'] > 0:
+                return ids.get('tmdb'), ids['tvdb']
+            tmdb_id = ids.get('tmdb')
+            if not tmdb_id:
+                print(f"{YELLOW}No TMDB ID found for {show['title']}{RESET}")
+                return None
     
-                    tmdb_id = trakt_show['show']['ids'].get('tmdb')
-                    if not tmdb_id:
-                        print(f"{YELLOW}No TMDB ID found for {show['title']}{RESET}")
-                        continue
+        try:
+            external_ids = self.tmdb.get_json(f"/tv/{tmdb_id}/external_ids")
+            tvdb_id = external_ids.get('tvdb_id')
+        except Exception as e:
+            print(f"{RED}Error fetching TVDB ID for {show['title']}: {e}{RESET}")
+            return None
+        if not tvdb_id or tvdb_id <= 0:
+            print(f"{YELLOW}Invalid TVDB ID for {show['title']}: {tvdb_id}{RESET}")
+            return None
+        return tmdb_id, tvdb_id
+
+    def _search_trakt_ids(self, show: Dict) -> Optional[Dict]:
+        """Find a show on Trakt by title and year and return its IDs"""
+        try:
+            trakt_search_url = f"/search/show?query={quote(show['title'])}"
+            if show.get('year'):
+                trakt_search_url += f"&year={show['year']}"
     
-                    try:
-                        tmdb_external_ids_url = f"https://api.themoviedb.org/3/tv/{tmdb_id}/external_ids"
-                        tmdb_params = {'api_key': self.tmdb_api_key}
-                        tmdb_resp = requests.get(tmdb_external_ids_url, params=tmdb_params)
-                        tmdb_resp.raise_for_status()
-                        external_ids = tmdb_resp.json()
-                        tvdb_id = external_ids.get('tvdb_id')
-                        
-                        if not tvdb_id or tvdb_id <= 0:
-                            print(f"{YELLOW}Invalid TVDB ID for {show['title']}: {tvdb_id}{RESET}")
-                            continue
-                    except Exception as e:
-                        print(f"{RED}Error fetching TVDB ID for {show['title']}: {e}{RESET}")
-                        continue
+            trakt_response = self.trakt.get(trakt_search_url, headers=self.trakt_headers)
+            trakt_response.raise_for_status()
+            trakt_results = trakt_response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"{RED}Error searching Trakt for {show['title']}: {e}{RESET}")
+            return None
     
-                    if tvdb_id in existing_tvdb_ids:
-                        # Find the existing show
-                        existing_show = next(s for s in existing_shows if s['tvdbId'] == tvdb_id)
-                        
-                        # Get the full series data from Sonarr regardless of monitoring option
-                        try:
-                            series_response = requests.get(
-                                f"{sonarr_url}/series/{existing_show['id']}", 
-                                headers=headers
-                            )
-                            series_response.raise_for_status()
-                            current_series = series_response.json()
-                            
-                            # Check if we need to update tags
-                            needs_tag_update = tag_id is not None and tag_id not in current_series.get('tags', [])
-                            
-                            # If monitoring is enabled or we need to add a tag
-                            if monitor_option != 'none' or needs_tag_update:
-                                print(f"{YELLOW}Show already in Sonarr: {show['title']}{RESET}")
-                                
-                                update_data = current_series.copy()
-                                
-                                # Add the configured tag if it exists and isn't already added
-                                if needs_tag_update:
-                                    if 'tags' not in update_data:
-                                        update_data['tags'] = []
-                                    update_data['tags'].append(tag_id)
-                                    print(f"{GREEN}Adding tag '{self.sonarr_config.get('sonarr_tag')}' to {show['title']}{RESET}")
-                                
-                                # Update monitoring only if monitoring option is not 'none'
-                                if monitor_option != 'none':
-                                    print(f"{GREEN}Updating monitoring status...{RESET}")
-                                    update_data['monitored'] = True
-                                    
-                                    # Update season monitoring based on monitor_option
-                                    if 'seasons' in current_series:
-                                        update_data['seasons'] = [
-                                            {
-                                                'seasonNumber': season['seasonNumber'],
-                                                'monitored': (
-                                                    monitor_option == 'all' or 
-                                                    (monitor_option == 'firstSeason' and season['seasonNumber'] == 1)
-                                                ),
-                                                'statistics': season.get('statistics', {}),
-                                            }
-                                            for season in current_series['seasons']
-                                            if season['seasonNumber'] != 0  # Exclude specials
-                                        ]
-                                
-                                # Update the show in Sonarr
-                                update_resp = requests.put(
-                                    f"{sonarr_url}/series/{existing_show['id']}", 
-                                    headers=headers, 
-                                    json=update_data
-                                )
-                                update_resp.raise_for_status()
-                                
-                                if monitor_option != 'none':
-                                    monitoring_message = 'all seasons' if monitor_option == 'all' else 'first season'
-                                    print(f"{GREEN}Updated show and {monitoring_message} monitoring for: {show['title']}{RESET}")
-                                
-                                # If search_missing is enabled and monitoring is updated, trigger a search
-                                if search_missing and monitor_option != 'none':
-                                    search_cmd = {
-                                        'name': 'MissingEpisodeSearch',
-                                        'seriesId': existing_show['id']
-                                    }
-                                    sr = requests.post(f"{sonarr_url}/command", headers=headers, json=search_cmd)
-                                    sr.raise_for_status()
-                                    print(f"{GREEN}Triggered search for: {show['title']}{RESET}")
-                            else:
-                                print(f"{YELLOW}Already in Sonarr: {show['title']}{RESET}")
-                            
-                            # Skip to next show after handling the existing one
-                            continue
-                                
-                        except requests.exceptions.RequestException as e:
-                            print(f"{RED}Error updating {show['title']} in Sonarr: {str(e)}{RESET}")
-                            if hasattr(e, 'response') and e.response is not None:
-                                try:
-                                    error_details = e.response.json()
-                                    print(f"{RED}Sonarr error details: {json.dumps(error_details, indent=2)}{RESET}")
-                                except:
-                                    print(f"{RED}Sonarr error response: {e.response.text}{RESET}")
-                            continue
-                        else:
-                            print(f"{YELLOW}Already in Sonarr: {show['title']}{RESET}")
-                            continue
+        if not trakt_results:
+            print(f"{YELLOW}Show not found on Trakt: {show['title']}{RESET}")
+            return None
     
-                    # Handle new show addition
-                    seasons = []
-                    if monitor_option == 'firstSeason':
-                        try:
-                            tmdb_seasons_url = f"https://api.themoviedb.org/3/tv/{tmdb_id}"
-                            tmdb_params = {'api_key': self.tmdb_api_key}
-                            resp = requests.get(tmdb_seasons_url, params=tmdb_params)
-                            if resp.status_code == 200:
-                                show_data = resp.json()
-                                seasons = [
-                                    {
-                                        'seasonNumber': s['season_number'],
-                                        'monitored': s['season_number'] == 1
-                                    } 
-                                    for s in show_data.get('seasons', [])
-                                    if s.get('season_number', -1) >= 0  # Exclude specials
-                                ]
-                        except Exception as e:
-                            print(f"{YELLOW}Failed to get season data: {e}. Monitoring all.{RESET}")
-                            monitor_option = 'all'
-    
-                    root_folder = self._map_path(self.sonarr_config['root_folder'].rstrip('/\\'))
-    
-                    # Build Sonarr payload
-                    show_data = {
-                        'tvdbId': tvdb_id,
-                        'title': show['title'],
-                        'qualityProfileId': quality_profile_id,
-                        'seasonFolder': season_folder,
-                        'rootFolderPath': root_folder,
-                        'monitored': True,
-                        'addOptions': {
-                            'searchForMissingEpisodes': search_missing,
-                            'monitor': monitor_option
-                        }
+        trakt_show = next(
+            (r for r in trakt_results
+             if r['show']['title'].lower() == show['title'].lower()
+             and r['show'].get('year') == show.get('year')),
+            trakt_results[0]
+        )
+        return trakt_show['show'].get('ids', {})
+
+    def _submit_to_sonarr(self, sonarr: SonarrClient, show: Dict, tmdb_id: Optional[int], tvdb_id: int,
+                          existing_by_tvdb: Dict[int, Dict], settings: Dict) -> Optional[int]:
+        """Add or update one show in Sonarr, returning its series ID if it should be searched"""
+        try:
+            existing_show = existing_by_tvdb.get(tvdb_id)
+            if existing_show:
+                return self._update_sonarr_series(sonarr, show, existing_show, settings)
+            return self._add_sonarr_series(sonarr, show, tmdb_id, tvdb_id, settings)
+        except requests.exceptions.RequestException as e:
+            action = "updating" if tvdb_id in existing_by_tvdb else "processing"
+            print(f"{RED}Error {action} {show['title']} in Sonarr: {str(e)}{RESET}")
+            if hasattr(e, 'response') and e.response is not None:
+                try:
+                    error_details = e.response.json()
+                    print(f"{RED}Sonarr error details: {json.dumps(error_details, indent=2)}{RESET}")
+                except:
+                    print(f"{RED}Sonarr error response: {e.response.text}{RESET}")
+            return None
+
+    def _update_sonarr_series(self, sonarr: SonarrClient, show: Dict, existing_show: Dict,
+                              settings: Dict) -> Optional[int]:
+        tag_id = settings['tag_id']
+        monitor_option = settings['monitor_option']
+    
+        # Get the full series data from Sonarr regardless of monitoring option
+        series_response = sonarr.get(f"/series/{existing_show['id']}")
+        series_response.raise_for_status()
+        current_series = series_response.json()
+        
+        # Check if we need to update tags
+        needs_tag_update = tag_id is not None and tag_id not in current_series.get('tags', [])
+        
+        if monitor_option == 'none' and not needs_tag_update:
+            print(f"{YELLOW}Already in Sonarr: {show['title']}{RESET}")
+            return None
+    
+        print(f"{YELLOW}Show already in Sonarr: {show['title']}{RESET}")
+        update_data = current_series.copy()
+        
+        # Add the configured tag if it exists and isn't already added
+        if needs_tag_update:
+            update_data['tags'] = update_data.get('tags', []) + [tag_id]
+            print(f"{GREEN}Adding tag '{self.sonarr_config.get('sonarr_tag')}' to {show['title']}{RESET}")
+        
+        # Update monitoring only if monitoring option is not 'none'
+        if monitor_option != 'none':
+            print(f"{GREEN}Updating monitoring status...{RESET}")
+            update_data['monitored'] = True
+            
+            # Update season monitoring based on monitor_option
+            if 'seasons' in current_series:
+                update_data['seasons'] = [
+                    {
+                        'seasonNumber': season['seasonNumber'],
+                        'monitored': (
+                            monitor_option == 'all' or 
+                            (monitor_option == 'firstSeason' and season['seasonNumber'] == 1)
+                        ),
+                        'statistics': season.get('statistics', {}),
                     }
-                    
-                    if seasons:
-                        show_data['seasons'] = seasons
-                    elif monitor_option == 'firstSeason':
-                        print(f"{YELLOW}Couldn't get season data, monitoring all{RESET}")
-                        show_data['addOptions']['monitor'] = 'all'
-    
-                    if tag_id is not None:
-                        show_data['tags'] = [tag_id]
-    
-                    add_resp = requests.post(f"{sonarr_url}/series", headers=headers, json=show_data)
-                    add_resp.raise_for_status()
-    
-                    if monitor_option != 'none' and search_missing:
-                        new_id = add_resp.json()['id']
-                        search_cmd = {'name': 'SeriesSearch', 'seriesIds': [new_id]}
-                        sr = requests.post(f"{sonarr_url}/command", headers=headers, json=search_cmd)
-                        sr.raise_for_status()
-                        print(f"{GREEN}Added and triggered download search for: {show['title']}{RESET}")
-                    else:
-                        print(f"{GREEN}Added: {show['title']}{RESET}")
+                    for season in current_series['seasons']
+                    if season['seasonNumber'] != 0  # Exclude specials
+                ]
+        
+        update_resp = sonarr.put(f"/series/{existing_show['id']}", json=update_data)
+        update_resp.raise_for_status()
+        
+        if monitor_option == 'none':
+            return None
+        monitoring_message = 'all seasons' if monitor_option == 'all' else 'first season'
+        print(f"{GREEN}Updated show and {monitoring_message} monitoring for: {show['title']}{RESET}")
+        return existing_show['id'] if settings['search_missing'] else None
+
+    def _add_sonarr_series(self, sonarr: SonarrClient, show: Dict, tmdb_id: Optional[int], tvdb_id: int,
+                           settings: Dict) -> Optional[int]:
+        monitor_option = settings['monitor_option']
+        seasons = []
+        if monitor_option == 'firstSeason' and tmdb_id:
+            try:
+                show_data = self.tmdb.get_json(f"/tv/{tmdb_id}")
+                seasons = [
+                    {
+                        'seasonNumber': s['season_number'],
+                        'monitored': s['season_number'] == 1
+                    } 
+                    for s in show_data.get('seasons', [])
+                    if s.get('season_number', -1) >= 0  # Exclude specials
+                ]
+            except requests.exceptions.HTTPError:
+                pass
+            except Exception as e:
+                print(f"{YELLOW}Failed to get season data: {e}. Monitoring all.{RESET}")
+                monitor_option = 'all'
     
-                except requests.exceptions.RequestException as e:
-                    print(f"{RED}Error processing {show['title']}: {str(e)}{RESET}")
-                    if hasattr(e, 'response') and e.response is not None:
-                        try:
-                            error_details = e.response.json()
-                            print(f"{RED}Sonarr error details: {json.dumps(error_details, indent=2)}{RESET}")
-                        except:
-                            print(f"{RED}Sonarr error response: {e.response.text}{RESET}")
-                    continue
+        # Build Sonarr payload
+        show_data = {
+            'tvdbId': tvdb_id,
+            'title': show['title'],
+            'qualityProfileId': settings['quality_profile_id'],
+            'seasonFolder': settings['season_folder'],
+            'rootFolderPath': settings['root_folder'],
+            'monitored': True,
+            'addOptions': {
+                'searchForMissingEpisodes': settings['search_missing'],
+                'monitor': monitor_option
+            }
+        }
+        
+        if seasons:
+            show_data['seasons'] = seasons
+        elif monitor_option == 'firstSeason':
+            print(f"{YELLOW}Couldn't get season data, monitoring all{RESET}")
+            show_data['addOptions']['monitor'] = 'all'
     
-        except Exception as e:
-            print(f"{RED}Error adding shows to Sonarr: {e}{RESET}")
-            import traceback
-            print(traceback.format_exc())
+        if settings['tag_id'] is not None:
+            show_data['tags'] = [settings['tag_id']]
+    
+        add_resp = sonarr.post("/series", json=show_data)
+        add_resp.raise_for_status()
+        print(f"{GREEN}Added: {show['title']}{RESET}")
+    
+        if monitor_option != 'none' and settings['search_missing']:
+            return add_resp.json()['id']
+        return None
+
+    def _trigger_sonarr_search(self, sonarr: SonarrClient, series_ids: List[int]):
+        """Search the added/updated series, one SeriesSearch command each
+        (SeriesSearch only takes a single seriesId)"""
+        searched = 0
+        for series_id in series_ids:
+            try:
+                sr = sonarr.post("/command", json={'name': 'SeriesSearch', 'seriesId': series_id})
+                sr.raise_for_status()
+                searched += 1
+            except requests.exceptions.RequestException as e:
+                print(f"{RED}Error triggering search for series {series_id}: {e}{RESET}")
+        if searched:
+            print(f"{GREEN}Triggered download search for {searched} shows{RESET}")
+
+# ------------------------------------------------------------------------
+# PROCESS-POOL SCORING
+# ------------------------------------------------------------------------
+# Candidates and scorer for the worker processes. Set before the pool starts,
+# so forked workers inherit them instead of receiving a pickled copy per task.
+_SCORING_STATE = {}
+
+class SimilarityScorer:
+    """What _calculate_similarity_from_cache reads, without the Plex/API state,
+    so worker processes score with exactly the same code"""
+    _calculate_similarity_from_cache = PlexTVRecommender._calculate_similarity_from_cache
+
+    def __init__(self, profile: 'UserProfile', weights: Dict, use_tmdb_keywords: bool):
+        self.profile = profile
+        self.weights = weights
+        self.use_tmdb_keywords = use_tmdb_keywords
+
+    def _get_user_profile(self) -> 'UserProfile':
+        return self.profile
+
+def _rank_key(item: Tuple[float, int]) -> Tuple[float, int]:
+    # Highest score first; ties keep library order, like the stable sort of the in-process path
+    return item[0], -item[1]
+
+def _init_scoring_worker(state: Optional[Dict]):
+    # Only needed without fork: the state then arrives pickled once per worker
+    if state is not None:
+        _SCORING_STATE.update(state)
+
+def _score_partition(start: int, end: int, top_k: int) -> List[Tuple[float, int]]:
+    """Score shows[start:end] and return their top_k as (score, index)"""
+    shows = _SCORING_STATE['shows']
+    scorer = _SCORING_STATE['scorer']
+    scored = [(scorer._calculate_similarity_from_cache(shows[idx])[0], idx) for idx in range(start, end)]
+    return heapq.nlargest(top_k, scored, key=_rank_key)
+
+def score_shows_in_processes(shows: List[Dict], scorer: SimilarityScorer, processes: int,
+                             top_k: int) -> List[Tuple[float, int]]:
+    """Partition shows across a process pool and merge each partition's top_k heap"""
+    use_fork = 'fork' in multiprocessing.get_all_start_methods()
+    state = {'shows': shows, 'scorer': scorer}
+    _SCORING_STATE.update(state)
+    # A few partitions per process so one slow partition doesn't leave the others idle
+    chunk = max(1, math.ceil(len(shows) / (processes * 4)))
+    try:
+        with ProcessPoolExecutor(max_workers=processes,
+                                 mp_context=multiprocessing.get_context('fork') if use_fork else None,
+                                 initializer=_init_scoring_worker,
+                                 initargs=(None if use_fork else state,)) as executor:
+            futures = [
+                executor.submit(_score_partition, start, min(start + chunk, len(shows)), top_k)
+                for start in range(0, len(shows), chunk)
+            ]
+            partials = [future.result() for future in futures]
+    finally:
+        _SCORING_STATE.clear()
+    return heapq.nlargest(top_k, (item for partial in partials for item in partial), key=_rank_key)
 
 # ------------------------------------------------------------------------
 # OUTPUT FORMATTING
 # ------------------------------------------------------------------------
+def _benchmark_load(backend: str, path: str) -> Tuple[float, Optional[int]]:
+    """Load one show cache file in a fresh process; returns (seconds, RSS growth in KB)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        resource = None
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+    start = time.perf_counter()
+    store = SQLiteShowStore(path) if backend == 'sqlite' else JSONShowStore(path)
+    store.load()
+    elapsed = time.perf_counter() - start
+    if resource is None:
+        return elapsed, None
+    growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return elapsed, growth // 1024 if sys.platform == 'darwin' else growth
+
+def benchmark_cache_backends(cache_dir: str, runs: int = 5):
+    """Compare save time, file size, load time and RSS of the show cache backends on the current cache"""
+    import tempfile
+    
+    db_path = os.path.join(cache_dir, CACHE_DB_NAME)
+    json_path = os.path.join(cache_dir, "all_shows_cache.json")
+    if os.path.exists(db_path):
+        cache = SQLiteShowStore(db_path).load()
+    else:
+        cache = JSONShowStore(json_path).load()
+    if not cache or not cache.get('shows'):
+        print(f"{RED}No show cache found in {cache_dir} to benchmark{RESET}")
+        return
+    
+    print(f"{CYAN}Benchmarking show cache backends on {len(cache['shows'])} shows ({runs} loads each){RESET}")
+    print(f"{'Backend':<8} {'Size':>10} {'Save':>9} {'Load':>9} {'Load RSS':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend, store in (('json', JSONShowStore(os.path.join(tmp, "shows.json"))),
+                               ('sqlite', SQLiteShowStore(os.path.join(tmp, "shows.db")))):
+            start = time.perf_counter()
+            store.save(cache)
+            save_time = time.perf_counter() - start
+            if backend == 'sqlite':
+                store.conn.close()
+            size = os.path.getsize(store.path) / (1024 * 1024)
+            
+            load_times, rss = [], []
+            for _ in range(runs):
+                # A new process per load so the RSS high-water mark is not shared
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    elapsed, growth = executor.submit(_benchmark_load, backend, store.path).result()
+                load_times.append(elapsed)
+                if growth is not None:
+                    rss.append(growth)
+            load_time = sorted(load_times)[len(load_times) // 2]
+            rss_text = f"{max(rss) / 1024:.1f} MB" if rss else "n/a"
+            print(f"{backend:<8} {size:>7.1f} MB {save_time:>8.2f}s {load_time:>8.2f}s {rss_text:>11}")
+
 def format_show_output(show: Dict,
                       show_summary: bool = False,
                       index: Optional[int] = None,
@@ -2822,6 +4191,29 @@ class TeeLogger:
             sys.__stdout__.flush()
         self.logfile.flush()
 
+class ThreadOutputRouter:
+    """stdout replacement that sends output from threads that called ``capture``
+    to their own buffer and everything else to the wrapped stream."""
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers = {}
+
+    def capture(self):
+        self.buffers[threading.get_ident()] = io.StringIO()
+
+    def release(self) -> str:
+        """Stop capturing for this thread and return its output, with progress bars
+        reduced to their final state"""
+        text = self.buffers.pop(threading.get_ident()).getvalue()
+        return re.sub(r'[^\n]*\r', '', text)
+
+    def write(self, text):
+        self.buffers.get(threading.get_ident(), self.stream).write(text)
+
+    def flush(self):
+        if threading.get_ident() not in self.buffers:
+            self.stream.flush()
+
 def cleanup_old_logs(log_dir: str, keep_logs: int):
     if keep_logs <= 0:
         return
@@ -2880,33 +4272,7 @@ def main():
         process_recommendations(base_config, config_path, keep_logs)
     else:
         # Individual runs for each user
-        for user in all_users:
-            print(f"\n{GREEN}Processing recommendations for user: {user}{RESET}")
-            print("-" * 50)
-            
-            # Create modified config for this user
-            user_config = copy.deepcopy(base_config)
-            
-            # Resolve Admin to actual username if needed
-            resolved_user = user
-            try:
-                account = MyPlexAccount(token=base_config['plex']['token'])
-                admin_username = account.username
-                if user.lower() in ['admin', 'administrator']:
-                    resolved_user = admin_username
-                    print(f"{YELLOW}Resolved Admin to: {admin_username}{RESET}")
-            except Exception as e:
-                print(f"{YELLOW}Could not resolve admin username: {e}{RESET}")
-            
-            if 'managed_users' in user_config['plex']:
-                user_config['plex']['managed_users'] = resolved_user
-            elif 'users' in user_config.get('tautulli', {}):
-                user_config['tautulli']['users'] = [resolved_user]
-            
-            # Process recommendations for this user
-            process_recommendations(user_config, config_path, keep_logs, single_user=resolved_user)
-            print(f"\n{GREEN}Completed processing for user: {resolved_user}{RESET}")
-            print("-" * 50)
+        process_users(base_config, config_path, keep_logs, all_users)
 
     runtime = datetime.now() - start_time
     hours = runtime.seconds // 3600
@@ -2915,7 +4281,79 @@ def main():
     print(f"\n{GREEN}All processing completed!{RESET}")
     print(f"Total runtime: {hours:02d}:{minutes:02d}:{seconds:02d}")
 
-def process_recommendations(config, config_path, keep_logs, single_user=None):
+def process_users(base_config, config_path, keep_logs, all_users):
+    """Run each user separately on one shared Plex connection, show cache and set of API clients.
+
+    Watch profiles are built concurrently (general.max_workers) with each
+    worker's output buffered; output, labels and Sonarr then run one user at
+    a time, starting with that buffered output, so each user keeps their own log.
+    """
+    # Resolve Admin to actual username if needed
+    resolved_users = []
+    admin_username = None
+    for user in all_users:
+        if user.lower() in ['admin', 'administrator']:
+            try:
+                if admin_username is None:
+                    admin_username = MyPlexAccount(token=base_config['plex']['token']).username
+                print(f"{YELLOW}Resolved Admin to: {admin_username}{RESET}")
+                user = admin_username
+            except Exception as e:
+                print(f"{YELLOW}Could not resolve admin username: {e}{RESET}")
+        resolved_users.append(user)
+
+    try:
+        shared = PlexTVRecommender.shared_context(config_path)
+        if shared.vectorized_scoring:
+            # Every user is scored against the same candidate matrix
+            shared._get_feature_matrix()
+    except Exception as e:
+        print(f"\n{RED}An error occurred: {e}{RESET}")
+        import traceback
+        print(traceback.format_exc())
+        return
+
+    print(f"\n{YELLOW}Building watch profiles for {len(resolved_users)} users...{RESET}")
+    recommenders = {}
+    profile_output = {}
+    router = ThreadOutputRouter(sys.stdout)
+    sys.stdout = router
+    try:
+        with ThreadPoolExecutor(max_workers=min(shared.max_workers, len(resolved_users))) as executor:
+            futures = {
+                executor.submit(_build_user_recommender, router, config_path, user, shared): user
+                for user in resolved_users
+            }
+            for future in as_completed(futures):
+                user = futures[future]
+                recommenders[user], profile_output[user] = future.result()
+                status = "Built" if recommenders[user] else f"{RED}Failed to build{RESET}"
+                print(f"{status} watch profile for {user}")
+    finally:
+        sys.stdout = router.stream
+
+    for user in resolved_users:
+        print(f"\n{GREEN}Processing recommendations for user: {user}{RESET}")
+        print("-" * 50)
+        # A failed profile is built again here, inside the user's logged run
+        process_recommendations(base_config, config_path, keep_logs, single_user=user,
+                                recommender=recommenders[user], profile_output=profile_output[user])
+        print(f"\n{GREEN}Completed processing for user: {user}{RESET}")
+        print("-" * 50)
+
+def _build_user_recommender(router: ThreadOutputRouter, config_path: str, user: str, shared):
+    """Build one user's recommender, capturing its output for that user's log.
+    Returns (recommender or None, output)."""
+    router.capture()
+    recommender = None
+    try:
+        recommender = PlexTVRecommender(config_path, user, shared)
+    except Exception as e:
+        print(f"{RED}Error building watch profile for {user}: {e}{RESET}")
+    return recommender, router.release()
+
+def process_recommendations(config, config_path, keep_logs, single_user=None, recommender=None,
+                            profile_output=''):
     original_stdout = sys.stdout
     log_dir = os.path.join(os.path.dirname(__file__), 'Logs')
     
@@ -2931,9 +4369,14 @@ def process_recommendations(config, config_path, keep_logs, single_user=None):
         except Exception as e:
             print(f"{RED}Could not set up logging: {e}{RESET}")
 
+    # Output of a watch profile built ahead of this run
+    if profile_output:
+        sys.stdout.write(profile_output)
+
     try:
         # Create recommender with single user context
-        recommender = PlexTVRecommender(config_path, single_user)
+        if recommender is None:
+            recommender = PlexTVRecommender(config_path, single_user)
         recommendations = recommender.get_recommendations()
         
         print(f"\n{GREEN}=== Recommended Unwatched Shows in Your Library ==={RESET}")
@@ -2979,6 +4422,11 @@ def process_recommendations(config, config_path, keep_logs, single_user=None):
         print(traceback.format_exc())
 
     finally:
+        if recommender is not None:
+            recommender.flush_watched_cache()
+        if recommender is not None and recommender.tmdb.response_cache:
+            recommender.tmdb.response_cache.save()
+            print(f"TMDB response cache: {recommender.tmdb.response_cache.stats()}")
         if keep_logs > 0 and sys.stdout is not original_stdout:
             try:
                 sys.stdout.logfile.close()
@@ -2987,4 +4435,7 @@ def process_recommendations(config, config_path, keep_logs, single_user=None):
                 print(f"{YELLOW}Error closing log file: {e}{RESET}")
 	
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if '--benchmark-cache' in sys.argv:
+        benchmark_cache_backends(os.path.join(os.path.dirname(__file__), "cache"))
+    else:
+        main()
\ No newline at end of file